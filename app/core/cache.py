@@ -0,0 +1,130 @@
+"""
+Pluggable key/value caches for read-mostly data.
+
+    MemoryCache  per-process LRU with TTL (default)
+    RedisCache   shared across workers (pip install redis)
+    NullCache    caching disabled
+
+Values must be JSON-serialisable so every backend can hold them.
+The memory backend only sees invalidations made by its own process;
+with several uvicorn workers use Redis or keep the TTL short.
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+from app.core.metrics import Counter
+
+CACHE_HITS = Counter("cache_hits_total", "Cache lookups answered from the cache", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Cache lookups that fell through to the database", ["cache"])
+
+
+class Cache(ABC):
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        ...
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self._get(key)
+        if value is None:
+            CACHE_MISSES.inc(cache=self.name)
+        else:
+            CACHE_HITS.inc(cache=self.name)
+        return value
+
+    async def delete(self, key: str) -> None:
+        await self.delete_many([key])
+
+    async def clear(self) -> None:
+        """Drop everything. Only needed by benchmarks and tooling."""
+
+
+class NullCache(Cache):
+    async def get(self, key):
+        return None  # disabled: don't skew hit-ratio metrics
+
+    async def _get(self, key):
+        return None
+
+    async def set(self, key, value):
+        pass
+
+    async def delete_many(self, keys):
+        pass
+
+
+class MemoryCache(Cache):
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        super().__init__(name, ttl)
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    async def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete_many(self, keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisCache(Cache):
+    def __init__(self, name: str, ttl: float, url: str):
+        super().__init__(name, ttl)
+        import redis.asyncio as redis  # optional dependency
+
+        self._redis = redis.from_url(url)
+        self._prefix = f"{name}:"
+
+    async def _get(self, key):
+        raw = await self._redis.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key, value):
+        await self._redis.set(self._prefix + key, json.dumps(value, default=str), ex=max(1, int(self.ttl)))
+
+    async def delete_many(self, keys):
+        keys = [self._prefix + key for key in keys]
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=self._prefix + "*"):
+            await self._redis.delete(key)
+
+
+def build_cache(name: str, backend: str, ttl: float, maxsize: int, redis_url: str = "") -> Cache:
+    if backend == "redis":
+        return RedisCache(name, ttl, redis_url)
+    if backend == "memory" and ttl > 0:
+        return MemoryCache(name, ttl, maxsize)
+    return NullCache(name, ttl)
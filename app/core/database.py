@@ -1,16 +1,128 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+# Map sync driver URLs from .env onto their asyncio drivers, so existing
+# DATABASE_URL values (postgresql://, sqlite://) keep working unchanged.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (queueing + connect)",
+)
+POOL_HELD_SECONDS = Histogram(
+    "db_pool_connection_held_seconds",
+    "Time a connection stays checked out of the pool",
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT",
+)
+STATEMENT_SECONDS = Histogram(
+    "db_statement_seconds",
+    "Time spent executing each SQL statement",
+)
+
+
+@dataclass
+class QueryStats:
+    """SQL executed on behalf of one unit of work (e.g. an HTTP request)."""
+    count: int = 0
+    seconds: float = 0.0
+    statements: StatementCounter = field(default_factory=StatementCounter)  # SQL text -> executions
+
+
+# Set by the request middleware; statements run while it is set are tallied
+# into it. Async sessions run in the caller's context, so this follows the
+# request through every await.
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def get_async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+engine = create_async_engine(
+    get_async_url(settings.DATABASE_URL),
+    echo=settings.DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+Gauge("db_pool_size", "Configured persistent connections", fn=lambda: engine.pool.size())
+Gauge("db_pool_checked_out", "Connections currently in use", fn=lambda: engine.pool.checkedout())
+Gauge("db_pool_checked_in", "Idle connections in the pool", fn=lambda: engine.pool.checkedin())
+Gauge("db_pool_overflow", "Connections open beyond pool_size (negative = unused capacity)", fn=lambda: engine.pool.overflow())
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop("checked_out_at", None)
+    if checked_out_at is not None:
+        POOL_HELD_SECONDS.observe(time.perf_counter() - checked_out_at)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, so a statement that raises leaves nothing behind
+    context.statement_started_at = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.statement_started_at
+    STATEMENT_SECONDS.observe(elapsed)
+    stats = query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+
+
+# expire_on_commit=False: objects stay readable after commit without
+# triggering an implicit (and, under asyncio, illegal) lazy refresh.
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
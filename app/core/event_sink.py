@@ -0,0 +1,80 @@
+"""
+Destinations for domain events relayed out of the transactional outbox.
+
+    MemorySink  keeps the last N events in process (default, local testing)
+    FileSink    appends NDJSON lines to a file
+    NullSink    drops everything
+
+Delivery is at-least-once: a relay that crashes between publishing and
+recording it publishes the batch again. Every event carries its outbox
+`id`, unique per event; consumers dedupe on it. Ids are not an offset:
+they are handed out at INSERT, transactions commit in another order, so
+a lower id can be published after a higher one.
+"""
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Iterator, Optional
+from starlette.concurrency import run_in_threadpool
+
+
+class EventSink(ABC):
+    @abstractmethod
+    async def publish(self, events: list[dict]) -> None:
+        """Deliver a batch in order. Raise to have the batch retried."""
+
+    async def aclose(self) -> None:
+        """Release resources on shutdown."""
+
+
+class NullSink(EventSink):
+    async def publish(self, events):
+        pass
+
+
+class MemorySink(EventSink):
+    def __init__(self, maxlen: int = 10000):
+        self.events: deque[dict] = deque(maxlen=maxlen)
+
+    async def publish(self, events):
+        self.events.extend(events)
+
+    def read(self, seen: Optional[set[int]] = None) -> list[dict]:
+        """Events whose id is not in `seen`, once each; adds their ids to it."""
+        seen = set() if seen is None else seen
+        events = []
+        for event in self.events:
+            if event["id"] not in seen:
+                seen.add(event["id"])
+                events.append(event)
+        return events
+
+
+class FileSink(EventSink):
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, events: list[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(event, default=str) + "\n" for event in events)
+
+    async def publish(self, events):
+        await run_in_threadpool(self._append, events)
+
+    def read(self, seen: Optional[set[int]] = None) -> Iterator[dict]:
+        """Events whose id is not in `seen`, skipping redelivered duplicates; adds their ids to it."""
+        seen = set() if seen is None else seen
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                if event["id"] not in seen:
+                    seen.add(event["id"])
+                    yield event
+
+
+def build_event_sink(backend: str, path: str = "") -> EventSink:
+    if backend == "file":
+        return FileSink(path)
+    if backend == "memory":
+        return MemorySink()
+    return NullSink()
@@ -0,0 +1,59 @@
+"""
+Probes for orchestrators.
+
+    GET /health/live   the process is up and serving; never touches the DB
+    GET /health/ready  the database answers and its schema is at the
+                       latest migration; 503 with a reason otherwise
+
+Startup itself does no I/O, so a worker comes up even while Postgres is
+still starting; it reports ready once the database is reachable and
+migrated (`alembic upgrade head`).
+"""
+import asyncio
+from functools import cache
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import engine
+
+router = APIRouter(prefix="/health", tags=["Health"], include_in_schema=False)
+
+
+@cache
+def migration_heads() -> frozenset[str]:
+    """Head revision(s) shipped with this build, read once on first use."""
+    # Imported here: alembic is only needed once a probe arrives, not at startup
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return frozenset(ScriptDirectory.from_config(Config("alembic.ini")).get_heads())
+
+
+async def _schema_revisions() -> set[str]:
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        return set(result.scalars())
+
+
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    try:
+        revisions = await asyncio.wait_for(_schema_revisions(), settings.READINESS_TIMEOUT)
+    except Exception as e:
+        # Unreachable, too slow, or never migrated (no alembic_version table)
+        return JSONResponse({"status": "unavailable", "reason": type(e).__name__}, status_code=503)
+
+    heads = await run_in_threadpool(migration_heads)  # file reads on the first probe
+    if revisions != heads:
+        return JSONResponse(
+            {"status": "unavailable", "reason": f"schema at {sorted(revisions)}, expected {sorted(heads)}"},
+            status_code=503,
+        )
+    return {"status": "ready"}
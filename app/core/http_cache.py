@@ -0,0 +1,97 @@
+"""
+Conditional GET helpers: ETags, If-None-Match and Cache-Control.
+
+A 304 answer is decided before the response body is built, so a client
+that already has the current version costs neither serialization nor
+the bytes on the wire.
+
+Handlers tag the uncompressed body; ETagGZipMiddleware gives the gzipped
+copy its own tag ("abc" -> "abc-gzip"), since a strong ETag names one
+exact byte sequence. is_not_modified accepts either.
+"""
+import hashlib
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+# Browsers revalidate every time (cheap with ETags); shared caches/CDNs may
+# serve a copy for a few seconds and keep serving it while refetching.
+CATALOG_CACHE_CONTROL = "public, max-age=0, s-maxage=10, stale-while-revalidate=30"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag derived from whatever identifies the representation."""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Tag of `encoding` applied to the representation tagged `etag`."""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def request_etags(header: str) -> set[str]:
+    # A client may send several tags, possibly weak (W/"...")
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = request_etags(header)
+    return etag in candidates or encoded_etag(etag, "gzip") in candidates
+
+
+def not_modified(etag: str, cache_control: str = CATALOG_CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str = CATALOG_CACHE_CONTROL) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+class _VariantETagGZipResponder(GZipResponder):
+    def __init__(self, app, minimum_size: int, compresslevel: int, client_etags: set[str]):
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        self.client_etags = client_etags
+
+    async def __call__(self, scope, receive, send):
+        async def send_tagged(message):
+            if message["type"] == "http.response.start":
+                self._tag_variant(message)
+            await send(message)
+
+        await super().__call__(scope, receive, send_tagged)
+
+    def _tag_variant(self, message) -> None:
+        headers = MutableHeaders(raw=message["headers"])
+        etag = headers.get("etag")
+        # Weak tags already allow byte differences; app-encoded bodies are tagged by the app
+        if not etag or etag.startswith("W/") or self.content_encoding_set:
+            return
+        variant = encoded_etag(etag, "gzip")
+        compressed = headers.get("content-encoding") == "gzip"
+        # A 304 repeats the tag the client revalidated with
+        if compressed or (message["status"] == 304 and variant in self.client_etags):
+            headers["etag"] = variant
+
+
+class ETagGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that gives the responses it compresses their own ETag."""
+
+    async def __call__(self, scope, receive, send):
+        headers = Headers(scope=scope) if scope["type"] == "http" else None
+        if headers is None or "gzip" not in headers.get("accept-encoding", ""):
+            await super().__call__(scope, receive, send)
+            return
+        responder = _VariantETagGZipResponder(
+            self.app,
+            self.minimum_size,
+            compresslevel=self.compresslevel,
+            client_etags=request_etags(headers.get("if-none-match", "")),
+        )
+        await responder(scope, receive, send)
@@ -0,0 +1,135 @@
+"""
+Per-request instrumentation, as plain ASGI middleware.
+
+    RequestMetricsMiddleware  latency, SQL count and SQL time per route,
+                              N+1 detection, Server-Timing header
+    ProfilerMiddleware        cProfile for one request, on demand
+
+Route labels are path templates ("/products/{product_id}"), never raw
+paths, so metric cardinality stays bounded.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+from app.core.database import QueryStats, query_stats
+from app.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL per request",
+    ["route"],
+)
+N_PLUS_ONE = Counter(
+    "http_request_n_plus_one_total",
+    "Requests that ran one statement at least N_PLUS_ONE_THRESHOLD times",
+    ["route"],
+)
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app, n_plus_one_threshold: int = 10):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries", app;dur={elapsed_ms:.1f}'.encode(),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.reset(token)
+            route = route_label(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status_code)
+            REQUEST_QUERIES.observe(stats.count, route=route)
+            REQUEST_DB_SECONDS.observe(stats.seconds, route=route)
+            self._check_n_plus_one(scope, route, stats)
+
+    def _check_n_plus_one(self, scope, route: str, stats: QueryStats) -> None:
+        if not stats.statements:
+            return
+        statement, executions = stats.statements.most_common(1)[0]
+        if executions >= self.n_plus_one_threshold:
+            N_PLUS_ONE.inc(route=route)
+            logger.warning(
+                "Possible N+1 on %s %s: statement ran %d times: %s",
+                scope["method"], route, executions, " ".join(statement.split())[:200],
+            )
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a request when it sends `X-Profile: 1`, or at random with
+    probability `sample_rate`, and logs the top functions by cumulative
+    time. Only mount it when profiling is wanted: profiling is not free.
+
+    cProfile sees everything the event loop runs meanwhile, including
+    other requests, so profile on a quiet instance. One profile runs at a
+    time; requests that arrive meanwhile are served unprofiled.
+    """
+
+    def __init__(self, app, sample_rate: float = 0.0, top: int = 30):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.top = top
+        self._active = False
+
+    def _wanted(self, scope) -> bool:
+        if (b"x-profile", b"1") in scope.get("headers", []):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._active = False
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.top)
+            logger.info("Profile for %s %s\n%s", scope["method"], scope["path"], out.getvalue())
@@ -0,0 +1,56 @@
+"""
+Money: integer minor units in the database, Decimal in Python.
+
+Prices are stored as BIGINT cents/tiyins (1 unit = 100 minor units), so
+totals and SUM()s are exact integer arithmetic. In Python the same values
+are `Decimal`s with two places; they go out as plain JSON numbers so the
+API shape doesn't change.
+
+    price = Column(MoneyType, nullable=False)   # model
+    price: Money                                # schema
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Annotated
+from pydantic import Field, PlainSerializer
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+MINOR_UNITS = 100
+CENT = Decimal("0.01")
+
+# Request/response field: at most two decimal places, never negative
+Money = Annotated[
+    Decimal,
+    Field(ge=0, max_digits=15, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+
+def to_money(value) -> Decimal:
+    """Any number (int, str, Decimal, float) as a two-place Decimal."""
+    if isinstance(value, float):
+        value = repr(value)  # 19.99, not 19.989999999999998436805981327779591083526611328125
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_minor(value) -> int:
+    """19.99 -> 1999. The unit every gateway and the database speak."""
+    return int(to_money(value) * MINOR_UNITS)
+
+
+def from_minor(minor: int) -> Decimal:
+    """1999 -> Decimal('19.99')."""
+    return (Decimal(minor) / MINOR_UNITS).quantize(CENT)
+
+
+class MoneyType(TypeDecorator):
+    """BIGINT column of minor units that reads and writes `Decimal`s."""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_minor(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_minor(value)
@@ -0,0 +1,45 @@
+"""
+Keyset ("seek") pagination helpers for newest-first listings.
+
+Pages are ordered by (created_at DESC, id DESC) and the cursor records the
+last row of the previous page, so every page costs one index range scan
+no matter how deep the client has paged — unlike OFFSET.
+"""
+import base64
+import binascii
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def before_cursor(created_at_column, id_column, cursor: str):
+    """WHERE clause selecting rows that sort after `cursor` in newest-first order."""
+    last_created_at, last_id = decode_cursor(cursor)
+    # Compare against the stored timestamp of the anchor row so ties
+    # resolve identically on every backend (SQLite keeps CURRENT_TIMESTAMP
+    # as text without microseconds). The cursor value is the fallback
+    # when the anchor row has since been deleted.
+    anchor = (
+        select(created_at_column)
+        .where(id_column == last_id)
+        .correlate(None)
+        .scalar_subquery()
+    )
+    return tuple_(created_at_column, id_column) < tuple_(func.coalesce(anchor, last_created_at), last_id)
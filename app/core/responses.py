@@ -0,0 +1,28 @@
+"""
+orjson-backed JSON responses.
+
+ORJSONResponse is the app's default response class, so every endpoint
+renders through orjson. List endpoints go further: they build plain dicts
+straight from row tuples and return an ORJSONResponse themselves, which
+skips FastAPI's response_model pass (validate every item, then dump it
+again). Their `response_model` still documents the shape in OpenAPI, so
+those dicts must carry exactly the model's keys.
+
+Output matches what pydantic would emit: Money as a JSON number, UTC
+datetimes with a "Z" suffix.
+"""
+from decimal import Decimal
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)  # as the Money serializer does
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
@@ -1,9 +1,21 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.core.metrics import Counter
 
-pwd_context = CryptContext(schemes = ["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes = ["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -11,6 +23,84 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
 
+def verify_and_update_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify, and return a fresh hash too if the stored one uses outdated settings."""
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+# bcrypt burns ~250 ms of CPU per call. It runs in a dedicated process pool
+# so it neither holds the GIL nor occupies the event loop, and a semaphore
+# caps how many hashes may be in flight: during a login storm extra callers
+# get a fast 503 instead of queueing behind each other and everyone else.
+_hash_executor: ProcessPoolExecutor | None = None
+_hash_slots: asyncio.Semaphore | None = None
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_executor
+
+
+def _discard_hash_executor(broken: ProcessPoolExecutor) -> None:
+    global _hash_executor
+    if _hash_executor is broken:  # a concurrent caller may have replaced it already
+        _hash_executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_password_job(fn, *args):
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        loop = asyncio.get_running_loop()
+        # A worker that dies (OOM kill, crash) breaks the whole pool for good:
+        # start a fresh one and retry once
+        for _ in range(2):
+            executor = _get_hash_executor()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                logger.warning("Password hashing pool broke, starting a new one")
+                _discard_hash_executor(executor)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sign-in is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    finally:
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_and_update_password_async(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _run_password_job(verify_and_update_password, password, hashed_password)
+
+
+def shutdown_password_hasher() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
 
@@ -22,15 +112,91 @@ def create_access_token(data: dict) -> str:
 
     return encode_jwt
     
-def decode_access_token(token: str) -> dict | None:
-    try:
-        decode_token = jwt.decode(
-            token,
-            settings.JWT_SECRET,
-            algorithms = [settings.JWT_ALGORITHM]
-        )
 
-        return decode_token
-    
+def _decode_with_jose(token: str) -> dict | None:
+    try:
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
     except JWTError:
         return None
+
+
+def _decode_with_pyjwt(token: str) -> dict | None:
+    import jwt as pyjwt  # optional dependency, only needed for JWT_BACKEND=pyjwt
+
+    try:
+        return pyjwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    except pyjwt.PyJWTError:
+        return None
+
+
+JWT_BACKENDS = {"jose": _decode_with_jose, "pyjwt": _decode_with_pyjwt}
+
+
+def verify_access_token(token: str) -> dict | None:
+    """Full signature + claims check, no caching."""
+    return JWT_BACKENDS[settings.JWT_BACKEND](token)
+
+
+TOKEN_CACHE_HITS = Counter("auth_token_cache_hits_total", "Access tokens served from the verified-token cache")
+TOKEN_CACHE_MISSES = Counter("auth_token_cache_misses_total", "Access tokens that needed a full JWT verification")
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token payloads, keyed by SHA-256 of the token
+    (the raw bearer token is never stored). An entry expires at the
+    earlier of `ttl` seconds and the token's own `exp`.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        expires_at = time.time() + self.ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        key = self._key(token)
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+token_cache = TokenCache(maxsize=settings.JWT_CACHE_SIZE, ttl=settings.JWT_CACHE_TTL)
+
+
+def decode_access_token(token: str) -> dict | None:
+    if settings.JWT_CACHE_SIZE <= 0:
+        return verify_access_token(token)
+
+    payload = token_cache.get(token)
+    if payload is not None:
+        TOKEN_CACHE_HITS.inc()
+        return payload
+
+    TOKEN_CACHE_MISSES.inc()
+    payload = verify_access_token(token)
+    if payload is not None:
+        token_cache.put(token, payload)
+    return payload
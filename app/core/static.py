@@ -0,0 +1,89 @@
+"""
+Static files served from memory, compressed once.
+
+    index = StaticAsset.load("client/index.html", "text/html; charset=utf-8")
+    return index.response(request)
+
+The file is read and compressed (gzip, and brotli when the `brotli`
+package is installed) at startup; a request only picks the variant the
+client accepts. ETag and Last-Modified let browsers revalidate and get a
+304 with no body.
+"""
+import gzip
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from app.core.http_cache import encoded_etag, is_not_modified
+
+try:
+    import brotli  # optional: pip install brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# The SPA shell has no fingerprint in its URL, so browsers must revalidate it
+# on every load; with the validators below that is a 304 while it is unchanged.
+SHELL_CACHE_CONTROL = "no-cache"
+
+
+class StaticAsset:
+    def __init__(self, body: bytes, media_type: str, last_modified: float, cache_control: str = SHELL_CACHE_CONTROL):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.last_modified = int(last_modified)  # HTTP dates have whole seconds
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        # Best first. Each encoding is its own representation, with its own ETag.
+        self.variants: dict[str, tuple[bytes, str]] = {}
+        if BROTLI_AVAILABLE:
+            self.variants["br"] = (brotli.compress(body, quality=11), encoded_etag(etag, "br"))
+        self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), encoded_etag(etag, "gzip"))
+        self.variants["identity"] = (body, etag)
+
+    @classmethod
+    def load(cls, path: str, media_type: str, cache_control: str = SHELL_CACHE_CONTROL) -> "StaticAsset":
+        with open(path, "rb") as f:
+            body = f.read()
+        return cls(body, media_type, os.path.getmtime(path), cache_control)
+
+    def _choose_encoding(self, request: Request) -> str:
+        accepted = set()
+        for item in request.headers.get("accept-encoding", "").split(","):
+            coding, _, params = item.partition(";")
+            try:
+                weight = float(params.strip().removeprefix("q=") or 1)
+            except ValueError:
+                weight = 1.0
+            if weight > 0:
+                accepted.add(coding.strip().lower())
+        for encoding in self.variants:
+            if encoding in accepted or "*" in accepted:
+                return encoding
+        return "identity"
+
+    def _is_fresh(self, request: Request, etag: str) -> bool:
+        # If-None-Match wins when both are sent (RFC 9110 13.2.2)
+        if "if-none-match" in request.headers:
+            return is_not_modified(request, etag)
+        since = request.headers.get("if-modified-since")
+        if not since:
+            return False
+        try:
+            return self.last_modified <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def response(self, request: Request) -> Response:
+        encoding = self._choose_encoding(request)
+        body, etag = self.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if self._is_fresh(request, etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
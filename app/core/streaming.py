@@ -0,0 +1,56 @@
+"""
+Incremental parsing of uploaded text, so request bodies are never held in
+memory whole.
+
+    async for record in aiter_csv_records(aiter_lines(request.stream())):
+        ...
+"""
+import codecs
+import csv
+from typing import AsyncIterator
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Re-split a byte stream into text lines (newline kept)."""
+    # Incremental: a multi-byte character may straddle two chunks
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")  # the tail may be half a line
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def aiter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[list[str]]:
+    """
+    CSV records from a line stream. Quoted fields may span lines: a record
+    is complete once its quotes balance (escaped quotes come in pairs).
+    """
+    pending = ""
+    async for line in lines:
+        pending += line
+        if pending.count('"') % 2:
+            continue
+        if pending.strip():
+            yield next(csv.reader([pending]))
+        pending = ""
+    if pending.strip():
+        yield next(csv.reader([pending]))
+
+
+def csv_line(values: list) -> str:
+    """One CSV-encoded line, for streaming CSV out."""
+    writer = _LineWriter()
+    csv.writer(writer).writerow(values)
+    return writer.line
+
+
+class _LineWriter:
+    line = ""
+
+    def write(self, text: str) -> None:
+        self.line = text
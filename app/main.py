@@ -1,19 +1,75 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from app.core.database import engine, Base
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from app.core.config import settings
+from app.core.database import engine
+from app.core.event_sink import build_event_sink
+from app.core.health import router as health_router
+from app.core.http_cache import ETagGZipMiddleware
+from app.core.security import shutdown_password_hasher
+from app.core.metrics import render_latest
+from app.core.responses import ORJSONResponse
+from app.core.middleware import ProfilerMiddleware, RequestMetricsMiddleware
+from app.core.static import StaticAsset
 from app.modules.auth.router import router as auth_router
 from app.modules.products.router import router as product_router
 from app.modules.cart.router import router as cart_router
-from app.modules.auth.models import User
-from app.modules.products.models import Product
-from app.modules.cart.models import Cart, CartItem
+from app.modules.payments.gateway import build_gateway
 from app.modules.payments.router import router as payments_router
-from app.modules.payments.models import Order, OrderItem
+from app.modules.payments.tasks import run_outbox_relay, run_reconciler, run_reservation_sweeper, run_webhook_consumer
 
-app = FastAPI(title="E-Commerce API")
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No database I/O here: the schema is Alembic's job (`alembic upgrade head`),
+    # and the pool connects on first use. /health/ready tells when the DB is there.
+    app.state.index_page = StaticAsset.load("client/index.html", "text/html; charset=utf-8")
+    gateway = app.state.gateway = build_gateway(
+        app_id=settings.MULTICARD_APP_ID,
+        secret=settings.MULTICARD_SECRET,
+        test_mode=settings.MULTICARD_TEST_MODE,
+        webhook_secret=settings.WEBHOOK_SECRET,
+    )
+    event_sink = build_event_sink(settings.EVENT_SINK, settings.EVENT_SINK_PATH)
+    sweeper = asyncio.create_task(run_reservation_sweeper(settings.RESERVATION_SWEEP_INTERVAL))
+    webhook_consumer = asyncio.create_task(
+        run_webhook_consumer(settings.WEBHOOK_CONSUME_INTERVAL, settings.WEBHOOK_BATCH_SIZE)
+    )
+    reconciler = asyncio.create_task(run_reconciler(
+        gateway,
+        settings.RECONCILE_INTERVAL,
+        min_age=settings.RECONCILE_MIN_AGE,
+        batch_size=settings.RECONCILE_BATCH_SIZE,
+        concurrency=settings.RECONCILE_CONCURRENCY,
+        rate=settings.RECONCILE_RATE,
+    ))
+    outbox_relay = asyncio.create_task(
+        run_outbox_relay(event_sink, settings.OUTBOX_RELAY_INTERVAL, settings.OUTBOX_BATCH_SIZE)
+    )
+    yield
+    tasks = [sweeper, webhook_consumer, reconciler, outbox_relay]
+    for task in tasks:
+        task.cancel()
+    # Let them unwind (close their sessions) before the pool goes away;
+    # disposing under an in-flight rollback can hang the driver.
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await event_sink.aclose()
+    await gateway.aclose()
+    shutdown_password_hasher()
+    await engine.dispose()
 
+
+app = FastAPI(title="E-Commerce API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware, sample_rate=settings.PROFILER_SAMPLE_RATE)
+# Responses that already carry Content-Encoding (the SPA shell) pass through
+# untouched; gzipped API responses get a "-gzip" ETag of their own
+app.add_middleware(ETagGZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_LEVEL)
+app.add_middleware(RequestMetricsMiddleware, n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD)
+
+app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(product_router)
 app.include_router(cart_router)
@@ -21,6 +77,12 @@ app.include_router(payments_router)
 
 
 @app.get("/", response_class=HTMLResponse)
-def serve_client():
-    with open("client/index.html", "r") as f:
-        return HTMLResponse(f.read())
\ No newline at end of file
+async def serve_client(request: Request):
+    """The SPA shell, from memory, precompressed, revalidated with ETag/Last-Modified."""
+    return request.app.state.index_page.response(request)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (request latency, SQL per route, pool usage, ...)."""
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
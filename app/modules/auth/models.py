@@ -1,5 +1,5 @@
 from app.core.database import Base
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -7,7 +7,13 @@ class User(Base):
     __tablename__ = "users"
 
     id= Column(Integer, primary_key=True, index=True)
-    username=Column(String, unique=True, nullable=False)
+    username=Column(String, nullable=False)
     email=Column(String, nullable=False)
     hashed_password= Column(String, nullable=False)
     created_at=Column(DateTime(timezone=True), server_default=func.now())
+
+    # Case-insensitive uniqueness. Lookups must compare lower(column) to hit these.
+    __table_args__ = (
+        Index("uq_users_username_lower", func.lower(username), unique=True),
+        Index("uq_users_email_lower", func.lower(email), unique=True),
+    )
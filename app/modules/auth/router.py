@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.modules.auth.schemas import RegisterRequest, LoginRequest, TokenResponse
 from app.modules.auth import service
@@ -7,8 +7,8 @@ from app.modules.auth import service
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register", response_model=TokenResponse)
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
-    return service.register_user(
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
+    return await service.register_user(
         db=db,
         username=request.username,
         email=request.email,
@@ -16,8 +16,8 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    return service.login_user(
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
+    return await service.login_user(
         db=db,
         username=request.username,
         password=request.password,
@@ -1,53 +1,96 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import String, select, update, func, literal, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from app.modules.auth.models import User
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_and_update_password_async, create_access_token
 
 
-def register_user(db: Session, username: str, email: str, password: str) -> dict:
+def _same_folded(column, value: str):
+    # Both sides through the database's lower(), the one the unique indexes
+    # use: Python's str.lower() folds non-ASCII letters that SQLite's doesn't.
+    return func.lower(column) == func.lower(literal(value, String))
 
-    existing = db.query(User).filter(User.username == username).first()
-    if existing:
-        raise HTTPException(
+
+async def _find_duplicate(db: AsyncSession, username: str, email: str) -> HTTPException | None:
+    """One indexed query for both uniqueness rules."""
+    username_taken = _same_folded(User.username, username)
+    rows = (await db.execute(
+        select(username_taken.label("username_taken"))
+        .where(or_(username_taken, _same_folded(User.email, email)))
+        .limit(2)
+    )).all()
+
+    if any(row.username_taken for row in rows):
+        return HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
-
-    existing = db.query(User).filter(User.email == email).first()
-    if existing:
-        raise HTTPException(
+    if rows:
+        return HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    return None
+
+
+async def register_user(db: AsyncSession, username: str, email: str, password: str) -> dict:
+
+    # Cheap rejection before spending ~250 ms of bcrypt on a taken name
+    duplicate = await _find_duplicate(db, username, email)
+    # End the read transaction: the pooled connection goes back while the
+    # hash waits for admission and runs, instead of idling in a transaction
+    await db.rollback()
+    if duplicate:
+        raise duplicate
+
+    # bcrypt is CPU-bound — runs in the password hashing process pool
+    hashed_password = await hash_password_async(password)
 
     user = User(
         username=username,
         email=email,
-        hashed_password=hash_password(password),
+        hashed_password=hashed_password,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent signup — the unique indexes caught it
+        await db.rollback()
+        raise await _find_duplicate(db, username, email) or HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already registered"
+        )
     token = create_access_token({"user_id": user.id})
 
     return {"access_token": token, "token_type": "bearer"}
 
 
-def login_user(db: Session, username: str, password: str) -> dict:
+async def login_user(db: AsyncSession, username: str, password: str) -> dict:
 
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(
+        select(User.id, User.hashed_password).where(_same_folded(User.username, username))
+    )).first()
+    await db.rollback()  # no connection held while bcrypt runs, as in register_user
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
+    # BCRYPT_ROUNDS changed since this hash was made — upgrade it transparently
+    if new_hash:
+        await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+
     token = create_access_token({"user_id": user.id})
 
-    return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": token, "token_type": "bearer"}
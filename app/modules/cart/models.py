@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, ForeignKey, Column
+from sqlalchemy import String, Integer, ForeignKey, Column, Index
 from app.core.database import Base
 from sqlalchemy.orm import relationship
 
@@ -19,4 +19,9 @@ class CartItem(Base):
     quantity = Column(Integer, nullable=False, default=1)
 
     cart = relationship("Cart", back_populates="items")
-    product = relationship("Product")
\ No newline at end of file
+    product = relationship("Product")
+
+    __table_args__ = (
+        # Every cart read, clear and checkout filters on cart_id
+        Index("ix_cart_items_cart_id", cart_id),
+    )
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from app.core.money import Money
 
 
 class AddToCartRequest(BaseModel):
@@ -10,12 +11,12 @@ class CartItemResponse(BaseModel):
     id: int
     product_id: int
     product_name: str
-    product_price: float
+    product_price: Money
     quantity: int
-    subtotal: float
+    subtotal: Money
 
 
 class CartResponse(BaseModel):
     items: list[CartItemResponse]
-    total_price: float
+    total_price: Money
     item_count: int
\ No newline at end of file
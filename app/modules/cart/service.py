@@ -1,116 +1,135 @@
-from sqlalchemy.orm import Session
+from decimal import Decimal
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from app.modules.cart.models import Cart, CartItem
 from app.modules.products.models import Product
-from app.modules.cart.schemas import CartItemResponse, CartResponse
 
 
-def get_or_create_cart(db: Session, user_id: int) -> Cart:
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
+def _user_cart_id(user_id: int):
+    """Subquery for the user's cart id — lets statements skip a cart lookup."""
+    return select(Cart.id).where(Cart.user_id == user_id).scalar_subquery()
+
+
+async def get_or_create_cart(db: AsyncSession, user_id: int) -> Cart:
+    cart = await db.scalar(select(Cart).where(Cart.user_id == user_id))
 
     if not cart:
         cart = Cart(user_id=user_id)
         db.add(cart)
-        db.commit()
-        db.refresh(cart)
+        await db.flush()  # caller commits together with its own changes
 
     return cart
 
 
-def add_to_cart(db: Session, user_id: int, product_id: int, quantity: int) -> CartResponse:
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def add_to_cart(db: AsyncSession, user_id: int, product_id: int, quantity: int) -> dict:
+    # One round trip: the product's live stock (never a cached copy, so a
+    # stale read can't let validation pass), the user's cart and any
+    # existing line for this product.
+    row = (await db.execute(
+        select(Product.stock, Cart.id, CartItem)
+        .select_from(Product)
+        .outerjoin(Cart, Cart.user_id == user_id)
+        .outerjoin(CartItem, (CartItem.cart_id == Cart.id) & (CartItem.product_id == Product.id))
+        .where(Product.id == product_id)
+    )).first()
+
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
 
-    if product.stock < quantity:
+    stock, cart_id, existing_item = row
+
+    if stock < quantity:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Only {product.stock} items in stock"
+            detail=f"Only {stock} items in stock"
         )
 
-    cart = get_or_create_cart(db, user_id)
-
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.product_id == product_id,
-    ).first()
+    if cart_id is None:
+        cart_id = (await get_or_create_cart(db, user_id)).id
 
     if existing_item:
         new_quantity = existing_item.quantity + quantity
 
-        if new_quantity > product.stock:
+        if new_quantity > stock:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Only {product.stock} in stock, you already have {existing_item.quantity} in cart"
+                detail=f"Only {stock} in stock, you already have {existing_item.quantity} in cart"
             )
 
         existing_item.quantity = new_quantity
     else:
         new_item = CartItem(
-            cart_id=cart.id,
+            cart_id=cart_id,
             product_id=product_id,
             quantity=quantity,
         )
         db.add(new_item)
 
-    db.commit()
-    return get_cart(db, user_id)
+    await db.commit()
+    return await get_cart(db, user_id)
 
 
-def remove_from_cart(db: Session, user_id: int, item_id: int) -> CartResponse:
+async def remove_from_cart(db: AsyncSession, user_id: int, item_id: int) -> dict:
     """Remove a specific item from the user's cart."""
-    cart = get_or_create_cart(db, user_id)
-
-    item = db.query(CartItem).filter(
+    result = await db.execute(delete(CartItem).where(
         CartItem.id == item_id,
-        CartItem.cart_id == cart.id,  # Security: only remove from YOUR cart
-    ).first()
+        CartItem.cart_id == _user_cart_id(user_id),  # Security: only remove from YOUR cart
+    ))
 
-    if not item:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not in your cart"
         )
 
-    db.delete(item)
-    db.commit()
-    return get_cart(db, user_id)
+    await db.commit()
+    return await get_cart(db, user_id)
 
 
-def clear_cart(db: Session, user_id: int) -> None:
+async def clear_cart(db: AsyncSession, user_id: int) -> None:
     """Remove all items from the user's cart. Used after checkout."""
-    cart = get_or_create_cart(db, user_id)
-
-    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-    db.commit()
-
-
-def get_cart(db: Session, user_id: int) -> CartResponse:
-    cart = get_or_create_cart(db, user_id)
+    await db.execute(delete(CartItem).where(CartItem.cart_id == _user_cart_id(user_id)))
+    await db.commit()
+
+
+async def get_cart(db: AsyncSession, user_id: int) -> dict:
+    """The user's cart as a CartResponse-shaped dict, ready to serialize."""
+    # One round trip regardless of cart size: cart → items → the product
+    # columns we render, joined. No ORM objects, so nothing can lazy-load.
+    rows = (await db.execute(
+        select(
+            CartItem.id,
+            CartItem.quantity,
+            Product.id.label("product_id"),
+            Product.name,
+            Product.price,
+        )
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(Cart.user_id == user_id)
+        .order_by(CartItem.id)
+    )).all()
 
     items = []
-    total_price = 0.0
-
-    for cart_item in cart.items:
-        product = cart_item.product
+    total_price = Decimal(0)
+    item_count = 0
 
-        subtotal = product.price * cart_item.quantity
+    for item_id, quantity, product_id, name, price in rows:
+        subtotal = price * quantity
         total_price += subtotal
-
-        items.append(CartItemResponse(
-            id=cart_item.id,
-            product_id=product.id,
-            product_name=product.name,
-            product_price=product.price,
-            quantity=cart_item.quantity,
-            subtotal=round(subtotal, 2),
-        ))
-
-    return CartResponse(
-        items=items,
-        total_price=round(total_price, 2),
-        item_count=sum(item.quantity for item in items),
-    )
\ No newline at end of file
+        item_count += quantity
+
+        items.append({
+            "id": item_id,
+            "product_id": product_id,
+            "product_name": name,
+            "product_price": price,
+            "quantity": quantity,
+            "subtotal": subtotal,
+        })
+
+    return {"items": items, "total_price": total_price, "item_count": item_count}
@@ -1,6 +1,24 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Mapping, Optional
 import httpx  # HTTP client for making API calls
+from starlette.concurrency import run_in_threadpool
+from app.core.money import to_minor
+
+try:
+    import h2  # noqa: F401 — enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 @dataclass
 class PaymentResult:
@@ -12,6 +30,23 @@ class PaymentResult:
     payment_url: str    # where to redirect the user
     transaction_id: str # gateway's reference ID
     message: str
+    paid: bool = False  # settled on the spot; otherwise the order waits for webhook/reconciliation
+
+
+@dataclass
+class WebhookCallback:
+    """A provider callback reduced to what order processing needs."""
+    event_id: str  # unique per provider event; retries repeat it
+    order_id: int
+    status: str    # "paid", "failed", or anything else (ignored)
+
+
+class PaymentVerificationError(Exception):
+    """The gateway gave no definitive answer on whether a payment went through."""
+
+
+class PaymentOutcomeUnknown(Exception):
+    """A payment request may have reached the gateway, but no answer came back."""
 
 
 class PaymentGateway(ABC):
@@ -21,15 +56,57 @@ class PaymentGateway(ABC):
     """
 
     @abstractmethod
-    def create_payment(self, order_id: int, total_price: float, currency: str = "USD") -> PaymentResult:
-        """Start a payment. Returns URL where user completes payment."""
+    def create_payment(self, order_id: int, total_price: Decimal, currency: str = "USD") -> PaymentResult:
+        """
+        Start a payment. Returns URL where user completes payment. A failed
+        result means no payment was created; raise PaymentOutcomeUnknown
+        when the request may have gone through unanswered.
+        """
         ...
 
     @abstractmethod
     def verify_payment(self, transaction_id: str) -> bool:
-        """Check if a payment was completed. Called after user returns."""
+        """
+        Check if a payment was completed. False only when the provider says
+        it was not; raise when it can't say (outage, auth failure, garbled
+        reply), so callers don't mistake "unknown" for "unpaid".
+        """
         ...
 
+    # Non-blocking variants used by async code. The defaults run the sync
+    # method in a worker thread; gateways with an async client override them.
+
+    async def create_payment_async(self, order_id: int, total_price: Decimal, currency: str = "USD") -> PaymentResult:
+        return await run_in_threadpool(self.create_payment, order_id, total_price, currency)
+
+    async def verify_payment_async(self, transaction_id: str) -> bool:
+        return await run_in_threadpool(self.verify_payment, transaction_id)
+
+    async def aclose(self) -> None:
+        """Release network resources on shutdown."""
+
+    # Webhooks. The default scheme is an HMAC-SHA256 of the raw body in the
+    # X-Signature header; providers with their own scheme override both.
+
+    name: str = "generic"   # provider key in the webhook inbox
+    webhook_secret: str = ""
+
+    def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        if not self.webhook_secret:
+            return False
+        expected = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, headers.get("x-signature", ""))
+
+    def parse_webhook(self, payload: dict) -> WebhookCallback:
+        """Raises KeyError/ValueError on a malformed payload."""
+        order_id = int(payload["order_id"])
+        status = str(payload["status"])
+        return WebhookCallback(
+            event_id=str(payload.get("event_id") or f"{order_id}:{status}"),
+            order_id=order_id,
+            status=status,
+        )
+
 
 class MockGateway(PaymentGateway):
     """
@@ -43,19 +120,35 @@ class MockGateway(PaymentGateway):
         4. Everything else stays the same.
     """
 
-    def create_payment(self, order_id: int, total_price: float, currency: str = "USD") -> PaymentResult:
+    name = "mock"
+
+    def __init__(self, webhook_secret: str = ""):
+        self.webhook_secret = webhook_secret
+
+    def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        # No secret configured: local development, accept anything
+        return super().verify_webhook(body, headers) if self.webhook_secret else True
+
+    def create_payment(self, order_id: int, total_price: Decimal, currency: str = "USD") -> PaymentResult:
         # In real gateway: call Stripe/Payme API here
         return PaymentResult(
             success=True,
             payment_url=f"/checkout/success?order_id={order_id}",
             transaction_id=f"mock_txn_{order_id}",
             message=f"Mock payment of {total_price} {currency} created",
+            paid=True,  # mock payments complete immediately
         )
 
     def verify_payment(self, transaction_id: str) -> bool:
         # In real gateway: call Stripe/Payme API to verify
         return True  # Mock always succeeds
 
+    async def create_payment_async(self, order_id: int, total_price: Decimal, currency: str = "USD") -> PaymentResult:
+        return self.create_payment(order_id, total_price, currency)
+
+    async def verify_payment_async(self, transaction_id: str) -> bool:
+        return self.verify_payment(transaction_id)
+
 class MulticardGateway(PaymentGateway):
     """
     Multicard.uz payment gateway.
@@ -67,11 +160,35 @@ class MulticardGateway(PaymentGateway):
         4. User pays (test card: 8600533364098829, exp: 2806, OTP: 112233)
         5. Multicard calls our webhook → we update order status
 
+    Connections are pooled and kept alive across calls. The access token is
+    cached until shortly before it expires and refreshed by one caller at a
+    time. Idempotent calls are retried with jittered exponential backoff.
+
     Sandbox: https://dev-mesh.multicard.uz/
     Production: https://mesh.multicard.uz/
     """
 
-    def __init__(self, app_id: str, secret: str, is_test_mode: bool = True):
+    DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=15.0, write=10.0, pool=5.0)
+    LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0)
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+    # Failures that happen before the request leaves: it never reached Multicard
+    NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    TOKEN_TTL = 3600             # seconds, when the auth response carries no expiry
+    TOKEN_REFRESH_MARGIN = 60    # refresh this many seconds before expiry
+    BACKOFF_BASE = 0.2
+    BACKOFF_CAP = 5.0
+    STORE_ID = 6
+    name = "multicard"
+
+    def __init__(
+        self,
+        app_id: str,
+        secret: str,
+        is_test_mode: bool = True,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        max_retries: int = 3,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
         self._app_id = app_id
         self._secret = secret
         self._base_url = (
@@ -79,87 +196,239 @@ class MulticardGateway(PaymentGateway):
             if is_test_mode
             else "https://mesh.multicard.uz"
         )
+        self._max_retries = max_retries
         self._token = None
+        self._token_expires_at = 0.0  # time.monotonic() deadline
+        self._sync_lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
 
-    def _authenticate(self) -> str:
-        response = httpx.post(
-            f"{self._base_url}/auth",
-            json={
-                "application_id": self._app_id,
-                "secret": self._secret,
-            },
+        client_options = dict(
+            base_url=self._base_url,
+            timeout=timeout,
+            limits=self.LIMITS,
+            http2=HTTP2_AVAILABLE and transport is None,
         )
-        data = response.json()
+        # `transport` lets tests plug in httpx.MockTransport
+        self._client = httpx.Client(transport=transport, **client_options)
+        self._async_client = httpx.AsyncClient(transport=transport, **client_options)
+
+    async def aclose(self) -> None:
+        self._client.close()
+        await self._async_client.aclose()
+
+    # ─── Token handling ──────────────────────────────────────
 
+    def _token_is_fresh(self, rejected_token: Optional[str] = None) -> bool:
+        return (
+            self._token is not None
+            and self._token != rejected_token
+            and time.monotonic() < self._token_expires_at
+        )
+
+    def _store_token(self, data: dict) -> str:
         if "token" not in data:
             raise Exception(f"Multicard auth failed: {data}")
 
+        ttl = self.TOKEN_TTL
+        if data.get("expiry"):
+            try:
+                expiry = datetime.fromisoformat(str(data["expiry"]))
+                ttl = (expiry - datetime.now(expiry.tzinfo)).total_seconds()
+            except ValueError:
+                pass
+
         self._token = data["token"]
+        self._token_expires_at = time.monotonic() + ttl - self.TOKEN_REFRESH_MARGIN
         return self._token
 
-    def _get_headers(self) -> dict:
-        if not self._token:
-            self._authenticate()
+    def _auth_payload(self) -> dict:
+        return {"application_id": self._app_id, "secret": self._secret}
+
+    def _headers(self) -> dict:
         return {
             "Authorization": f"Bearer {self._token}",
             "X-Access-Token": self._token,
             "Content-Type": "application/json",
         }
 
-    def create_payment(self, order_id: int, total_price: float, currency: str = "UZS") -> PaymentResult:
-        try:
-            # Multicard amount is in tiyins (1 UZS = 100 tiyins)
-            amount_in_tiyins = int(total_price * 100)
+    def _get_headers(self, rejected_token: Optional[str] = None) -> dict:
+        if not self._token_is_fresh(rejected_token):
+            with self._sync_lock:
+                # Another thread may have refreshed while we waited
+                if not self._token_is_fresh(rejected_token):
+                    response = self._send("POST", "/auth", idempotent=True, json=self._auth_payload())
+                    self._store_token(response.json())
+        return self._headers()
 
-            headers = self._get_headers()
+    async def _get_headers_async(self, rejected_token: Optional[str] = None) -> dict:
+        if not self._token_is_fresh(rejected_token):
+            async with self._async_lock:
+                # Single flight: only the first waiter re-authenticates
+                if not self._token_is_fresh(rejected_token):
+                    response = await self._send_async("POST", "/auth", idempotent=True, json=self._auth_payload())
+                    self._store_token(response.json())
+        return self._headers()
+
+    # ─── Transport with retries ──────────────────────────────
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries out so callers don't stampede
+        return random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** attempt))
+
+    def _should_retry(self, attempt: int, idempotent: bool, error: Optional[Exception] = None, response: Optional[httpx.Response] = None) -> bool:
+        if attempt >= self._max_retries:
+            return False
+        if error is not None:
+            # A request that never reached Multicard is safe to retry
+            return idempotent or isinstance(error, self.NOT_SENT_ERRORS)
+        return idempotent and response.status_code in self.RETRYABLE_STATUS
+
+    def _send(self, method: str, url: str, idempotent: bool, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self._client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not self._should_retry(attempt, idempotent, error=e):
+                    raise
+            else:
+                if not self._should_retry(attempt, idempotent, response=response):
+                    return response
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def _send_async(self, method: str, url: str, idempotent: bool, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._async_client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not self._should_retry(attempt, idempotent, error=e):
+                    raise
+            else:
+                if not self._should_retry(attempt, idempotent, response=response):
+                    return response
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    # ─── Payments ────────────────────────────────────────────
+
+    def _invoice_payload(self, order_id: int, total_price: Decimal) -> dict:
+        # Multicard amount is in tiyins (1 UZS = 100 tiyins)
+        return {
+            "store_id": self.STORE_ID,
+            "amount": to_minor(total_price),
+            "invoice_id": str(order_id),
+            "return_url": "http://localhost:8000/",
+            "callback_url": "http://localhost:8000/checkout/webhook",
+        }
 
-            response = httpx.post(
-                f"{self._base_url}/payment/invoice",
-                headers=headers,
-                json={
-                    "store_id": 6,
-                    "amount": amount_in_tiyins,
-                    "invoice_id": str(order_id),
-                    "return_url": "http://localhost:8000/",
-                    "callback_url": "http://localhost:8000/checkout/webhook",
-                },
+    def _invoice_result(self, data: dict) -> PaymentResult:
+        if not data.get("success"):
+            error_msg = data.get("error", {}).get("details", str(data))
+            return PaymentResult(
+                success=False,
+                payment_url="",
+                transaction_id="",
+                message=f"Multicard error: {error_msg}",
             )
+
+        invoice = data["data"]
+        return PaymentResult(
+            success=True,
+            payment_url=invoice["checkout_url"],
+            transaction_id=invoice["uuid"],
+            message="Redirecting to Multicard checkout",
+        )
+
+    def _post_invoice(self, headers: dict, payload: dict) -> httpx.Response:
+        try:
+            # Invoice creation is not idempotent: only connect failures are retried
+            return self._send("POST", "/payment/invoice", idempotent=False, headers=headers, json=payload)
+        except self.NOT_SENT_ERRORS:
+            raise
+        except httpx.TransportError as e:
+            # Sent, but the reply was lost: the invoice may exist
+            raise PaymentOutcomeUnknown(f"Multicard invoice request failed after sending: {e!r}") from e
+
+    async def _post_invoice_async(self, headers: dict, payload: dict) -> httpx.Response:
+        try:
+            return await self._send_async("POST", "/payment/invoice", idempotent=False, headers=headers, json=payload)
+        except self.NOT_SENT_ERRORS:
+            raise
+        except httpx.TransportError as e:
+            raise PaymentOutcomeUnknown(f"Multicard invoice request failed after sending: {e!r}") from e
+
+    def verify_webhook(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        # Multicard signs callbacks with md5(store_id + invoice_id + amount + secret)
+        try:
+            payload = json.loads(body)
+            message = f"{payload['store_id']}{payload['invoice_id']}{payload['amount']}{self._secret}"
+        except (ValueError, KeyError, TypeError):
+            return False
+        expected = hashlib.md5(message.encode()).hexdigest()
+        return hmac.compare_digest(expected, str(payload.get("sign", "")))
+
+    def parse_webhook(self, payload: dict) -> WebhookCallback:
+        # Multicard only calls back for completed payments unless a status is given
+        status = str(payload.get("status") or "success")
+        return WebhookCallback(
+            event_id=f"{payload['uuid']}:{status}",
+            order_id=int(payload["invoice_id"]),
+            status="paid" if status in ("success", "paid") else "failed",
+        )
+
+    @staticmethod
+    def _is_paid(response: httpx.Response) -> bool:
+        # Only a well-formed answer about the invoice counts as "not paid"
+        if not response.is_success:
+            raise PaymentVerificationError(f"Multicard answered HTTP {response.status_code}")
+        try:
             data = response.json()
+            invoice = data["data"] if data.get("success") else None
+        except (ValueError, KeyError, AttributeError) as e:
+            raise PaymentVerificationError("Malformed Multicard reply") from e
+        if not isinstance(invoice, dict):
+            raise PaymentVerificationError(f"Multicard error: {data.get('error', data)}")
+        return (invoice.get("payment") or {}).get("status", "") == "paid"
+
+    def create_payment(self, order_id: int, total_price: Decimal, currency: str = "UZS") -> PaymentResult:
+        try:
+            payload = self._invoice_payload(order_id, total_price)
+            headers = self._get_headers()
+            response = self._post_invoice(headers, payload)
+
+            if response.status_code == 401:
+                # Token revoked before its expiry — refresh once and retry
+                headers = self._get_headers(rejected_token=headers["X-Access-Token"])
+                response = self._post_invoice(headers, payload)
 
-            if not data.get("success"):
-                # Token might be expired, retry once
-                self._token = None
-                headers = self._get_headers()
-                response = httpx.post(
-                    f"{self._base_url}/payment/invoice",
-                    headers=headers,
-                    json={
-                        "store_id": 6,
-                        "amount": amount_in_tiyins,
-                        "invoice_id": str(order_id),
-                        "return_url": "http://localhost:8000/",
-                        "callback_url": "http://localhost:8000/checkout/webhook",
-                    },
-                )
-                data = response.json()
-
-            if not data.get("success"):
-                error_msg = data.get("error", {}).get("details", str(data))
-                return PaymentResult(
-                    success=False,
-                    payment_url="",
-                    transaction_id="",
-                    message=f"Multicard error: {error_msg}",
-                )
-
-            invoice = data["data"]
+            return self._invoice_result(response.json())
+
+        except PaymentOutcomeUnknown:
+            raise  # not a rejection: the caller must not release the order
+        except Exception as e:
             return PaymentResult(
-                success=True,
-                payment_url=invoice["checkout_url"],
-                transaction_id=invoice["uuid"],
-                message="Redirecting to Multicard checkout",
+                success=False,
+                payment_url="",
+                transaction_id="",
+                message=f"Multicard error: {str(e)}",
             )
 
+    async def create_payment_async(self, order_id: int, total_price: Decimal, currency: str = "UZS") -> PaymentResult:
+        try:
+            payload = self._invoice_payload(order_id, total_price)
+            headers = await self._get_headers_async()
+            response = await self._post_invoice_async(headers, payload)
+
+            if response.status_code == 401:
+                headers = await self._get_headers_async(rejected_token=headers["X-Access-Token"])
+                response = await self._post_invoice_async(headers, payload)
+
+            return self._invoice_result(response.json())
+
+        except PaymentOutcomeUnknown:
+            raise
         except Exception as e:
             return PaymentResult(
                 success=False,
@@ -168,16 +437,28 @@ class MulticardGateway(PaymentGateway):
                 message=f"Multicard error: {str(e)}",
             )
 
+    # Unlike create_payment, failures propagate: transport errors, failed
+    # auth and non-2xx replies all mean "unknown", never "unpaid".
+
     def verify_payment(self, transaction_id: str) -> bool:
-        try:
-            response = httpx.get(
-                f"{self._base_url}/payment/invoice/{transaction_id}",
-                headers=self._get_headers(),
-            )
-            data = response.json()
-            if data.get("success"):
-                status = data["data"].get("payment", {}).get("status", "")
-                return status == "paid"
-            return False
-        except Exception:
-            return False
\ No newline at end of file
+        headers = self._get_headers()
+        response = self._send("GET", f"/payment/invoice/{transaction_id}", idempotent=True, headers=headers)
+        if response.status_code == 401:
+            headers = self._get_headers(rejected_token=headers["X-Access-Token"])
+            response = self._send("GET", f"/payment/invoice/{transaction_id}", idempotent=True, headers=headers)
+        return self._is_paid(response)
+
+    async def verify_payment_async(self, transaction_id: str) -> bool:
+        headers = await self._get_headers_async()
+        response = await self._send_async("GET", f"/payment/invoice/{transaction_id}", idempotent=True, headers=headers)
+        if response.status_code == 401:
+            headers = await self._get_headers_async(rejected_token=headers["X-Access-Token"])
+            response = await self._send_async("GET", f"/payment/invoice/{transaction_id}", idempotent=True, headers=headers)
+        return self._is_paid(response)
+
+
+def build_gateway(app_id: str = "", secret: str = "", test_mode: bool = True, webhook_secret: str = "") -> PaymentGateway:
+    """Multicard when credentials are configured, the mock otherwise."""
+    if app_id:
+        return MulticardGateway(app_id=app_id, secret=secret, is_test_mode=test_mode)
+    return MockGateway(webhook_secret=webhook_secret)
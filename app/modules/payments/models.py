@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.core.money import MoneyType
 
 
 class OrderStatus:
@@ -10,17 +11,46 @@ class OrderStatus:
     FAILED = "failed"
 
 
+class OrderEvent:
+    CREATED = "order.created"
+    PAID = "order.paid"
+    FAILED = "order.failed"
+
+
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    total_price = Column(Float, nullable=False)
+    total_price = Column(MoneyType, nullable=False)  # minor units
     status = Column(String, nullable=False, default=OrderStatus.PENDING)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Stock for a PENDING order is held until this moment, then released
+    reserved_until = Column(DateTime(timezone=True), nullable=True)
+    # Gateway reference from PaymentResult; what reconciliation verifies
+    transaction_id = Column(String, nullable=True)
 
     items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # Order history: one user's orders, newest first (keyset pagination)
+        Index("ix_orders_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        # Reservation sweeper: only pending orders are ever scanned
+        Index(
+            "ix_orders_pending_reserved_until",
+            reserved_until,
+            postgresql_where=status == OrderStatus.PENDING,
+            sqlite_where=status == OrderStatus.PENDING,
+        ),
+        # Reconciliation: pending orders that have a gateway invoice
+        Index(
+            "ix_orders_pending_transaction",
+            id,
+            postgresql_where=(status == OrderStatus.PENDING) & transaction_id.isnot(None),
+            sqlite_where=(status == OrderStatus.PENDING) & transaction_id.isnot(None),
+        ),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -29,7 +59,66 @@ class OrderItem(Base):
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     product_name = Column(String, nullable=False)
-    product_price = Column(Float, nullable=False)
+    product_price = Column(MoneyType, nullable=False)  # minor units
     quantity = Column(Integer, nullable=False)
 
-    order = relationship("Order", back_populates="items")
\ No newline at end of file
+    order = relationship("Order", back_populates="items")
+
+    __table_args__ = (
+        # A page of order history loads its line items with order_id IN (...)
+        Index("ix_order_items_order_id", order_id),
+    )
+
+
+class WebhookEvent(Base):
+    """
+    Inbox of payment provider callbacks. The webhook endpoint only inserts
+    here; a background consumer applies them to orders in batches.
+    """
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True)
+    provider = Column(String, nullable=False)
+    event_id = Column(String, nullable=False)
+    order_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # raw body, kept for audits and replays
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Provider retries repeat the event id; the duplicate insert is a no-op
+        UniqueConstraint("provider", "event_id", name="uq_webhook_events_provider_event_id"),
+        # Consumer queue: only unprocessed events are ever scanned
+        Index(
+            "ix_webhook_events_unprocessed",
+            id,
+            postgresql_where=processed_at.is_(None),
+            sqlite_where=processed_at.is_(None),
+        ),
+    )
+
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox. Order events are inserted in the same transaction
+    as the state change they describe; the relay publishes them afterwards.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)  # event id consumers dedupe on; not commit order
+    event_type = Column(String, nullable=False)
+    order_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Relay queue: only unpublished events are ever scanned
+        Index(
+            "ix_outbox_events_unpublished",
+            id,
+            postgresql_where=published_at.is_(None),
+            sqlite_where=published_at.is_(None),
+        ),
+    )
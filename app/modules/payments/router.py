@@ -1,44 +1,44 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
-from app.modules.payments.schemas import CheckoutResponse, OrderResponse
-from app.modules.payments.gateway import MockGateway
+from app.core.responses import ORJSONResponse
+from app.modules.payments.schemas import CheckoutResponse, OrderPage
 from app.modules.payments import service
-from app.core.config import settings
-from app.modules.payments.gateway import MockGateway, MulticardGateway
+from app.modules.payments.gateway import PaymentGateway
 from fastapi import Request
 
 router = APIRouter(prefix="/checkout", tags=["Checkout"])
 
-if settings.MULTICARD_APP_ID:
-    gateway = MulticardGateway(
-        app_id=settings.MULTICARD_APP_ID,
-        secret=settings.MULTICARD_SECRET,
-        is_test_mode=settings.MULTICARD_TEST_MODE,
-    )
-else:
-    gateway = MockGateway()
+
+def get_gateway(request: Request) -> PaymentGateway:
+    """The gateway the lifespan handler built (it owns the HTTP connection pool)."""
+    return request.app.state.gateway
 
 
 @router.post("/webhook")
-async def payment_webhook(request: Request, db: Session = Depends(get_db)):
+async def payment_webhook(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    gateway: PaymentGateway = Depends(get_gateway),
+):
     """
-    Multicard calls this URL after payment completes.
-    Updates order status from PENDING to PAID.
+    Multicard calls this URL after payment completes, and retries until it
+    gets a 200. Verify, store in the inbox (duplicates are dropped) and
+    answer right away; the webhook consumer updates the order.
     """
-    body = await request.json()
-
-    order_id = body.get("order_id")
-    status = body.get("status")
+    body = await request.body()
+    if not gateway.verify_webhook(body, request.headers):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature")
 
-    if order_id and status == "paid":
-        from app.modules.payments.models import Order, OrderStatus
-        order = db.query(Order).filter(Order.id == int(order_id)).first()
-        if order:
-            order.status = OrderStatus.PAID
-            db.commit()
+    try:
+        callback = gateway.parse_webhook(json.loads(body))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed callback")
 
+    await service.record_webhook(db, provider=gateway.name, callback=callback, payload=body)
     return {"success": True}
 
 
@@ -49,18 +49,23 @@ def payment_success():
     
 
 @router.post("/", response_model=CheckoutResponse)
-def checkout(
-    db: Session = Depends(get_db),
+async def checkout(
+    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user),
+    gateway: PaymentGateway = Depends(get_gateway),
 ):
     """POST /checkout — process cart into an order."""
-    return service.checkout(db=db, user_id=user_id, gateway=gateway)
+    return await service.checkout(db=db, user_id=user_id, gateway=gateway)
 
 
-@router.get("/orders", response_model=list[OrderResponse])
-def get_orders(
-    db: Session = Depends(get_db),
+@router.get("/orders", response_model=OrderPage)
+async def get_orders(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user),
 ):
-    """GET /checkout/orders — list your past orders."""
-    return service.get_orders(db=db, user_id=user_id)
\ No newline at end of file
+    """GET /checkout/orders — your past orders, newest first. `summary=true` skips line items."""
+    page = await service.get_orders(db=db, user_id=user_id, limit=limit, cursor=cursor, summary=summary)
+    return ORJSONResponse(page)
\ No newline at end of file
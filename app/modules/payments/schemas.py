@@ -1,14 +1,16 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
+from app.core.money import Money
 
 
 class OrderItemResponse(BaseModel):
     id: int
     product_id: int
     product_name: str
-    product_price: float
+    product_price: Money
     quantity: int
-    subtotal: float  # calculated: price * quantity
+    subtotal: Money  # calculated: price * quantity
 
     class Config:
         from_attributes = True
@@ -16,15 +18,20 @@ class OrderItemResponse(BaseModel):
 
 class OrderResponse(BaseModel):
     id: int
-    total_price: float
+    total_price: Money
     status: str
-    items: list[OrderItemResponse]
+    items: Optional[list[OrderItemResponse]] = None  # None in summary mode
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class OrderPage(BaseModel):
+    items: list[OrderResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to get the next page
+
+
 class CheckoutResponse(BaseModel):
     order_id: int
     status: str
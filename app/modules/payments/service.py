@@ -1,140 +1,505 @@
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from app.modules.payments.models import Order, OrderItem, OrderStatus
-from app.modules.payments.schemas import OrderResponse, OrderItemResponse, CheckoutResponse
-from app.modules.payments.gateway import PaymentGateway
-from app.modules.cart.service import get_cart, clear_cart, get_or_create_cart
-from app.modules.cart.models import CartItem
+from app.core.config import settings
+from app.core.pagination import encode_cursor, before_cursor
+from app.core.event_sink import EventSink
+from app.modules.payments.models import Order, OrderItem, OrderStatus, OrderEvent, OutboxEvent, WebhookEvent
+from app.modules.payments.schemas import CheckoutResponse
+from app.modules.payments.gateway import PaymentGateway, PaymentOutcomeUnknown, WebhookCallback
+from app.modules.cart.models import Cart, CartItem
 from app.modules.products.models import Product
+from app.modules.products.service import invalidate_products, reserve_stock, return_stock
 
-def checkout(db: Session, user_id: int, gateway: PaymentGateway) -> CheckoutResponse:
+logger = logging.getLogger(__name__)
+
+# INSERT ... ON CONFLICT DO NOTHING, per backend
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+async def add_order_events(db: AsyncSession, event_type: str, order_ids: list[int], **payload) -> None:
+    """Queue events in the outbox, inside the caller's transaction."""
+    if order_ids:
+        await db.execute(insert(OutboxEvent), [
+            {"event_type": event_type, "order_id": order_id, "payload": json.dumps(payload, default=str)}
+            for order_id in order_ids
+        ])
+
+
+async def confirm_payments(db: AsyncSession, order_ids: list[int]) -> list[int]:
     """
-    Full checkout flow:
-        1. Get user's cart
-        2. Validate stock for all items
-        3. Create Order + OrderItems
-        4. Reduce product stock
-        5. Call payment gateway
-        6. Clear cart
-        7. Return payment URL
+    Mark PENDING orders paid and queue their order.paid events. Returns
+    the ids that actually moved; anything else was already settled.
+    Caller commits.
+    """
+    confirmed = (await db.scalars(
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status == OrderStatus.PENDING)
+        .values(status=OrderStatus.PAID)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await add_order_events(db, OrderEvent.PAID, confirmed)
+    return list(confirmed)
+
+
+def _check_stock(products, quantities: dict[int, int]) -> None:
+    """400 naming the first cart line that can't be filled."""
+    products_by_id = {product.id: product for product in products}
+    for product_id, quantity in quantities.items():
+        product = products_by_id.get(product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Product {product_id} no longer exists"
+            )
+        if product.stock < quantity:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"'{product.name}' only has {product.stock} in stock, you requested {quantity}"
+            )
+
+
+async def checkout(db: AsyncSession, user_id: int, gateway: PaymentGateway) -> CheckoutResponse:
+    """
+    Two-phase checkout flow:
+        Phase 1 — reserve (one short transaction):
+            1. Get user's cart lines
+            2. Validate stock for all items
+            3. Create PENDING Order + OrderItems
+            4. Reduce product stock (the reservation): one conditional
+               UPDATE, so concurrent buyers can never oversell
+        Phase 2 — no transaction open:
+            5. Call payment gateway
+        Phase 3 — finalize or compensate:
+            6. Success: store the transaction id + clear ordered cart lines;
+               mark paid if the gateway settled on the spot, otherwise
+               the webhook or the reconciler does
+               Rejected: release the reservation
+               Timeout or lost reply: leave it PENDING; the sweeper
+               releases it when reserved_until passes
+            7. Return payment URL
+
+    The gateway call can take seconds, so no row locks or pooled
+    connections are held while it runs.
 
     Notice: gateway is passed as a parameter.
     This function doesn't know or care if it's Mock, Stripe, or Payme.
     That's the power of the interface pattern.
     """
 
-    # 1. Get cart
-    cart = get_cart(db, user_id)
+    # 1. Get cart lines, one per product: concurrent adds can leave two
+    #    lines for the same product, and both are being bought
+    cart_items = (await db.execute(
+        select(CartItem.product_id, func.sum(CartItem.quantity).label("quantity"))
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(Cart.user_id == user_id)
+        .group_by(CartItem.product_id)
+    )).all()
 
-    if not cart.items:
+    if not cart_items:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cart is empty"
         )
 
+    quantities = {item.product_id: item.quantity for item in cart_items}
+
     # 2. Validate stock for ALL items before creating order
     #    Why check all first? If item 3 of 5 is out of stock,
     #    we don't want to have already created a partial order.
-    cart_model = get_or_create_cart(db, user_id)
-    cart_items = db.query(CartItem).filter(CartItem.cart_id == cart_model.id).all()
+    #    No locks here: this read only produces friendly errors and the
+    #    price snapshot. The conditional UPDATE in step 4 is the real check.
+    products = (await db.execute(
+        select(Product.id, Product.name, Product.price, Product.stock)
+        .where(Product.id.in_(quantities))
+        .order_by(Product.id)
+    )).all()
+    _check_stock(products, quantities)
+
+    total_price = sum(p.price * quantities[p.id] for p in products)
 
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Product {item.product_id} no longer exists"
-            )
-        if product.stock < item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"'{product.name}' only has {product.stock} in stock, you requested {item.quantity}"
-            )
-        
     # 3. Create Order
     order = Order(
         user_id=user_id,
-        total_price=cart.total_price,
+        total_price=total_price,
         status=OrderStatus.PENDING,
+        reserved_until=datetime.now(timezone.utc) + timedelta(minutes=settings.ORDER_RESERVATION_MINUTES),
     )
     db.add(order)
-    db.flush()  # flush, not commit — gets order.id without finalizing
-    # Why flush instead of commit?
-    # If payment gateway fails, we can rollback everything.
-    # Commit is permanent. Flush is temporary.
-
-
-    # 4. Create OrderItems + reduce stock
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=product.id,
-            product_name=product.name,      # snapshot — won't change if product changes
-            product_price=product.price,    # snapshot — won't change if price changes
-            quantity=item.quantity,
+    await db.flush()  # gets order.id before inserting its items
+    await add_order_events(db, OrderEvent.CREATED, [order.id], user_id=user_id, total_price=total_price)
+
+    # 4. Create OrderItems (one multi-row INSERT) + reserve stock (one UPDATE)
+    await db.execute(insert(OrderItem), [
+        {
+            "order_id": order.id,
+            "product_id": product.id,
+            "product_name": product.name,      # snapshot — won't change if product changes
+            "product_price": product.price,    # snapshot — won't change if price changes
+            "quantity": quantities[product.id],
+        }
+        for product in products
+    ])
+
+    # The atomic decrement goes last, right before COMMIT, so hot product
+    # rows stay locked for one statement rather than the whole transaction.
+    if not await reserve_stock(db, quantities):
+        # Someone bought the last units since step 2
+        await db.rollback()
+        products = (await db.execute(
+            select(Product.id, Product.name, Product.price, Product.stock).where(Product.id.in_(quantities))
+        )).all()
+        _check_stock(products, quantities)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock changed during checkout, please try again"
         )
-        db.add(order_item)
 
-        # Reduce stock
-        product.stock -= item.quantity
+    # Commit the reservation. This ends the transaction, releases the row
+    # locks and hands the connection back to the pool.
+    await db.commit()
+    await invalidate_products(quantities)
 
     # 5. Call payment gateway
-    result = gateway.create_payment(
-        order_id=order.id,
-        total_price=cart.total_price,
-    )
+    try:
+        result = await asyncio.wait_for(
+            gateway.create_payment_async(order_id=order.id, total_price=total_price),
+            timeout=settings.PAYMENT_GATEWAY_TIMEOUT,
+        )
+    except (asyncio.TimeoutError, PaymentOutcomeUnknown):
+        # Outcome unknown (we gave up waiting, or the gateway client lost
+        # the reply) — the invoice may exist. Keep the reservation until it
+        # expires instead of guessing; only a definite rejection releases it.
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Payment gateway did not answer, order #{order.id} is pending",
+        )
 
+    # 6. Finalize or compensate
     if not result.success:
-        db.rollback()  # undo everything
+        restocked = await release_reservations(db, [order.id])
+        await db.commit()
+        await invalidate_products(restocked)
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail="Payment gateway failed: " + result.message,
         )
 
-    # 6. Mark order as paid (mock gateway always succeeds)
-    order.status = OrderStatus.PAID
-
-    # 7. Clear cart
-    clear_cart(db, user_id)
+    # Record the gateway reference, and mark the order paid if the gateway
+    # settled on the spot (mock). Otherwise it stays PENDING until the
+    # webhook or the reconciler confirms it. Conditional, so an order the
+    # sweeper already released is never resurrected.
+    values = {"transaction_id": result.transaction_id}
+    if result.paid:
+        values["status"] = OrderStatus.PAID
+    updated = await db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.status == OrderStatus.PENDING)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if not updated.rowcount:
+        order_status = OrderStatus.FAILED
+    elif result.paid:
+        order_status = OrderStatus.PAID
+        await add_order_events(db, OrderEvent.PAID, [order.id])
+    else:
+        order_status = OrderStatus.PENDING
 
-    # 8. Commit everything together — order, stock reduction, cart clear
-    db.commit()
+    # Clear the cart lines that became this order
+    await db.execute(delete(CartItem).where(
+        CartItem.cart_id == select(Cart.id).where(Cart.user_id == user_id).scalar_subquery(),
+        CartItem.product_id.in_(quantities),
+    ))
+    await db.commit()
 
     return CheckoutResponse(
         order_id=order.id,
-        status=order.status,
+        status=order_status,
         payment_url=result.payment_url,
         message=result.message,
     )
 
 
-def get_orders(db: Session, user_id: int) -> list[OrderResponse]:
-    """Get all orders for a user, newest first."""
-    orders = db.query(Order).filter(
-        Order.user_id == user_id
-    ).order_by(Order.created_at.desc()).all()
-
-    results = []
-    for order in orders:
-        items = []
-        for item in order.items:
-            items.append(OrderItemResponse(
-                id=item.id,
-                product_id=item.product_id,
-                product_name=item.product_name,
-                product_price=item.product_price,
-                quantity=item.quantity,
-                subtotal=round(item.product_price * item.quantity, 2),
-            ))
-
-        results.append(OrderResponse(
-            id=order.id,
-            total_price=order.total_price,
-            status=order.status,
-            items=items,
-            created_at=order.created_at,
-        ))
-
-    return results
\ No newline at end of file
+async def release_reservations(db: AsyncSession, order_ids: list[int]) -> list[int]:
+    """
+    Mark PENDING orders as failed, queue their order.failed events and
+    return their stock. Safe to call twice or concurrently: only orders
+    still pending get released.
+    Caller commits, then invalidates the returned product ids.
+    """
+    released = (await db.scalars(
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status == OrderStatus.PENDING)
+        .values(status=OrderStatus.FAILED)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    if not released:
+        return []
+    await add_order_events(db, OrderEvent.FAILED, released)
+
+    restock = dict((await db.execute(
+        select(OrderItem.product_id, func.sum(OrderItem.quantity))
+        .where(OrderItem.order_id.in_(released))
+        .group_by(OrderItem.product_id)
+    )).all())
+
+    await return_stock(db, restock)
+    return list(restock)
+
+
+async def release_expired_reservations(db: AsyncSession, batch_size: int = 100) -> int:
+    """
+    Release one batch of PENDING orders whose reservation has run out.
+    Orders with a gateway invoice are left to the reconciler, which asks
+    the gateway before releasing anything that might have been paid.
+    """
+    expired = (await db.scalars(
+        select(Order.id)
+        .where(
+            Order.status == OrderStatus.PENDING,
+            Order.transaction_id.is_(None),
+            Order.reserved_until < datetime.now(timezone.utc),
+        )
+        .order_by(Order.reserved_until)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # several workers can sweep at once
+    )).all()
+
+    if not expired:
+        return 0
+
+    restocked = await release_reservations(db, list(expired))
+    await db.commit()
+    await invalidate_products(restocked)
+    return len(expired)
+
+
+async def pending_payments(db: AsyncSession, after_id: int, created_before: datetime, batch_size: int = 200):
+    """
+    One batch of PENDING orders that have a gateway invoice and are older
+    than `created_before`, in id order. Pass the last id back as `after_id`.
+    """
+    return (await db.execute(
+        select(Order.id, Order.transaction_id, Order.created_at)
+        .where(
+            Order.status == OrderStatus.PENDING,
+            Order.transaction_id.isnot(None),
+            Order.id > after_id,
+            Order.created_at < created_before,
+        )
+        .order_by(Order.id)
+        .limit(batch_size)
+    )).all()
+
+
+async def settle_payments(db: AsyncSession, paid_ids: list[int], unpaid_ids: list[int]) -> tuple[int, int]:
+    """
+    Apply gateway verification results in bulk: paid orders are confirmed,
+    unpaid ones are released once their reservation has run out (before
+    that the customer may still be paying). Returns (confirmed, released).
+    """
+    confirmed = await confirm_payments(db, paid_ids) if paid_ids else []
+
+    expired = []
+    if unpaid_ids:
+        expired = (await db.scalars(
+            select(Order.id).where(
+                Order.id.in_(unpaid_ids),
+                Order.status == OrderStatus.PENDING,
+                Order.reserved_until < datetime.now(timezone.utc),
+            )
+        )).all()
+    restocked = await release_reservations(db, list(expired)) if expired else []
+
+    await db.commit()
+    await invalidate_products(restocked)
+    return len(confirmed), len(expired)
+
+
+async def record_webhook(db: AsyncSession, provider: str, callback: WebhookCallback, payload: bytes) -> bool:
+    """
+    Store a verified callback in the inbox. Returns False for a duplicate
+    (provider retry), which is not an error. Nothing else happens inline:
+    the consumer applies it to the order.
+    """
+    values = {
+        "provider": provider,
+        "event_id": callback.event_id,
+        "order_id": callback.order_id,
+        "status": callback.status,
+        "payload": payload.decode("utf-8", errors="replace"),
+    }
+    upsert_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert_insert is not None:
+        result = await db.execute(
+            upsert_insert(WebhookEvent).values(**values)
+            .on_conflict_do_nothing(index_elements=["provider", "event_id"])
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    try:
+        await db.execute(insert(WebhookEvent).values(**values))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+async def apply_webhook_events(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Apply one batch of inbox events to their orders, oldest first.
+
+    Transitions only ever leave PENDING, so replays, duplicates and
+    out-of-order callbacks are harmless: a late "failed" can't undo a
+    payment, and a late "paid" can't resurrect a released order (it is
+    logged for reconciliation instead). Within a batch, "paid" wins.
+    """
+    events = (await db.execute(
+        select(WebhookEvent.id, WebhookEvent.order_id, WebhookEvent.status)
+        .where(WebhookEvent.processed_at.is_(None))
+        .order_by(WebhookEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # several workers can consume at once
+    )).all()
+
+    if not events:
+        return 0
+
+    paid = {event.order_id for event in events if event.status == OrderStatus.PAID}
+    failed = {event.order_id for event in events if event.status == OrderStatus.FAILED} - paid
+
+    if paid:
+        confirmed = await confirm_payments(db, list(paid))
+        # Paid at the provider but already released here: money without stock
+        stranded = (await db.scalars(
+            select(Order.id).where(Order.id.in_(paid - set(confirmed)), Order.status != OrderStatus.PAID)
+        )).all()
+        for order_id in stranded:
+            logger.warning("Payment callback for order #%s, which is no longer pending", order_id)
+
+    restocked = await release_reservations(db, list(failed)) if failed else []
+
+    await db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id.in_([event.id for event in events]))
+        .values(processed_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await invalidate_products(restocked)
+    return len(events)
+
+
+async def relay_outbox(db: AsyncSession, sink: EventSink, batch_size: int = 500) -> int:
+    """
+    Publish one batch of outbox events to `sink`, lowest id first, then
+    mark them published. At-least-once: if publishing succeeds but the
+    commit doesn't, the batch goes out again. Relays take turns on the row
+    locks (no SKIP LOCKED), so no event is published twice concurrently.
+    An event whose transaction commits late goes out in a later batch,
+    after higher ids, which is why consumers dedupe by id instead of
+    keeping an offset.
+    """
+    events = (await db.scalars(
+        select(OutboxEvent)
+        .where(OutboxEvent.published_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update()
+    )).all()
+
+    if not events:
+        return 0
+
+    await sink.publish([
+        {
+            "id": event.id,
+            "type": event.event_type,
+            "order_id": event.order_id,
+            "data": json.loads(event.payload),
+            "created_at": event.created_at,
+        }
+        for event in events
+    ])
+
+    await db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_([event.id for event in events]))
+        .values(published_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return len(events)
+
+
+async def get_orders(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    summary: bool = False,
+) -> dict:
+    """
+    A user's orders, newest first, one page at a time, as an OrderPage-shaped
+    dict. Line items for the whole page come from a single extra query;
+    summary mode skips them. Built from column tuples: no ORM objects, no
+    per-item models.
+    """
+    query = select(Order.id, Order.total_price, Order.status, Order.created_at).where(Order.user_id == user_id)
+    if cursor:
+        query = query.where(before_cursor(Order.created_at, Order.id, cursor))
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(
+        query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+    )).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    orders = [
+        {"id": row.id, "total_price": row.total_price, "status": row.status, "items": None, "created_at": row.created_at}
+        for row in rows
+    ]
+
+    if not summary and orders:
+        by_id = {order["id"]: order for order in orders}
+        for order in orders:
+            order["items"] = []
+        items = await db.execute(
+            select(
+                OrderItem.order_id,
+                OrderItem.id,
+                OrderItem.product_id,
+                OrderItem.product_name,
+                OrderItem.product_price,
+                OrderItem.quantity,
+            )
+            .where(OrderItem.order_id.in_(by_id))
+            .order_by(OrderItem.id)
+        )
+        for order_id, item_id, product_id, product_name, product_price, quantity in items:
+            by_id[order_id]["items"].append({
+                "id": item_id,
+                "product_id": product_id,
+                "product_name": product_name,
+                "product_price": product_price,
+                "quantity": quantity,
+                "subtotal": product_price * quantity,
+            })
+
+    return {"items": orders, "next_cursor": next_cursor}
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from app.core.database import SessionLocal
+from app.core.event_sink import EventSink
+from app.core.metrics import Counter, Gauge, Histogram
+from app.modules.payments.gateway import PaymentGateway
+from app.modules.payments.service import (
+    apply_webhook_events,
+    pending_payments,
+    relay_outbox,
+    release_expired_reservations,
+    settle_payments,
+)
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PUBLISHED = Counter(
+    "outbox_events_published_total",
+    "Order events handed to the event sink (redeliveries included)",
+)
+RECONCILE_CHECKS = Counter(
+    "payment_reconciliation_checks_total",
+    "Pending orders verified with the gateway, by outcome",
+    ["result"],
+)
+RECONCILE_RELEASED = Counter(
+    "payment_reconciliation_released_total",
+    "Unpaid orders released after their reservation expired",
+)
+RECONCILE_PASS_SECONDS = Histogram(
+    "payment_reconciliation_pass_seconds",
+    "Duration of one reconciliation pass over all stale pending orders",
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+RECONCILE_LAG = Gauge(
+    "payment_reconciliation_lag_seconds",
+    "Age of the oldest pending order with an invoice, as of the last pass",
+)
+
+
+async def run_reservation_sweeper(interval: float, batch_size: int = 100) -> None:
+    """
+    Background loop: returns stock held by PENDING orders whose checkout
+    never finished (gateway timeout, crashed worker, abandoned payment).
+    """
+    while True:
+        try:
+            async with SessionLocal() as db:
+                # Drain full batches back to back, then wait for the next tick
+                while await release_expired_reservations(db, batch_size) == batch_size:
+                    pass
+        except Exception:
+            logger.exception("Reservation sweep failed")
+        await asyncio.sleep(interval)
+
+
+async def run_webhook_consumer(interval: float, batch_size: int = 500) -> None:
+    """Background loop: applies payment callbacks from the webhook inbox to orders."""
+    while True:
+        try:
+            async with SessionLocal() as db:
+                while await apply_webhook_events(db, batch_size) == batch_size:
+                    pass
+        except Exception:
+            logger.exception("Webhook consumer failed")
+        await asyncio.sleep(interval)
+
+
+async def run_outbox_relay(sink: EventSink, interval: float, batch_size: int = 500) -> None:
+    """Background loop: publishes order events from the outbox to `sink`."""
+    while True:
+        try:
+            async with SessionLocal() as db:
+                while True:
+                    published = await relay_outbox(db, sink, batch_size)
+                    OUTBOX_PUBLISHED.inc(published)
+                    if published < batch_size:
+                        break
+        except Exception:
+            logger.exception("Outbox relay failed")
+        await asyncio.sleep(interval)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart. Single event loop only."""
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        delay = self._next_at - now
+        self._next_at = max(now, self._next_at) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _age_seconds(created_at: datetime) -> float:
+    if created_at.tzinfo is None:  # SQLite hands back naive UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+
+async def reconcile_pending_orders(
+    gateway: PaymentGateway,
+    min_age: float = 120.0,
+    batch_size: int = 200,
+    concurrency: int = 10,
+    rate: float = 20.0,
+) -> int:
+    """
+    One pass over PENDING orders with an invoice older than `min_age`
+    seconds (their webhook is late or lost). Each batch is verified with
+    the gateway concurrently, bounded by `concurrency` calls in flight and
+    `rate` calls per second, then written back in one transaction. No
+    database connection is held while the gateway is being asked.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+
+    async def verify(transaction_id: str) -> Optional[bool]:
+        async with semaphore:
+            await limiter.wait()
+            try:
+                return await gateway.verify_payment_async(transaction_id)
+            except Exception:
+                logger.warning("Verifying transaction %s failed", transaction_id, exc_info=True)
+                return None
+
+    started = time.perf_counter()
+    created_before = datetime.now(timezone.utc) - timedelta(seconds=min_age)
+    after_id, checked, lag = 0, 0, 0.0
+
+    while True:
+        async with SessionLocal() as db:
+            batch = await pending_payments(db, after_id, created_before, batch_size)
+        if not batch:
+            break
+        after_id = batch[-1].id
+        lag = max(lag, max(_age_seconds(order.created_at) for order in batch))
+
+        results = await asyncio.gather(*(verify(order.transaction_id) for order in batch))
+        paid = [order.id for order, ok in zip(batch, results) if ok]
+        unpaid = [order.id for order, ok in zip(batch, results) if ok is False]
+        RECONCILE_CHECKS.inc(len(paid), result="paid")
+        RECONCILE_CHECKS.inc(len(unpaid), result="unpaid")
+        RECONCILE_CHECKS.inc(len(batch) - len(paid) - len(unpaid), result="error")
+
+        async with SessionLocal() as db:
+            _, released = await settle_payments(db, paid, unpaid)
+        RECONCILE_RELEASED.inc(released)
+        checked += len(batch)
+
+    RECONCILE_LAG.set(lag)
+    RECONCILE_PASS_SECONDS.observe(time.perf_counter() - started)
+    return checked
+
+
+async def run_reconciler(gateway: PaymentGateway, interval: float, **options) -> None:
+    """
+    Background loop: settles orders whose webhook never arrived by asking
+    the gateway directly. `options` go to reconcile_pending_orders.
+    """
+    while True:
+        try:
+            await reconcile_pending_orders(gateway, **options)
+        except Exception:
+            logger.exception("Payment reconciliation failed")
+        await asyncio.sleep(interval)
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, DDL, event
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.money import MoneyType
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 class Product(Base):
@@ -9,7 +15,61 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    price = Column(Float, nullable=False)
+    price = Column(MoneyType, nullable=False)  # minor units
     stock = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
\ No newline at end of file
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Bumped by every UPDATE, including set-based stock changes. Python-side
+    # so it has microsecond resolution on every backend — ETags depend on it.
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow, server_default=func.now())
+
+    # Indexes backing the keyset-paginated listing (newest first)
+    __table_args__ = (
+        Index("ix_products_created_at_id", created_at, id),
+        Index("ix_products_created_by_created_at_id", created_by, created_at, id),
+        Index("ix_products_price", price),
+        # Partial index: "in stock only" listings never touch sold-out rows
+        Index(
+            "ix_products_in_stock_created_at_id",
+            created_at,
+            id,
+            postgresql_where=stock > 0,
+            sqlite_where=stock > 0,
+        ),
+    )
+
+
+# ─── Full-text search index ──────────────────────────────────
+# Lives outside the ORM model because each backend spells it differently.
+# Postgres: a generated tsvector column + GIN index. The 'simple' config
+# (no stemming, no stop words) keeps prefix matching predictable for a
+# multilingual catalog. SQLite: an external-content FTS5 table kept in
+# sync by triggers. Migration 0006 creates the same objects.
+
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+        "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))) STORED",
+        "CREATE INDEX ix_products_search_vector ON products USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE products_fts USING fts5("
+        "name, description, content='products', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        # Only text edits touch the index; stock updates don't
+        "CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
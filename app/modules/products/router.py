@@ -1,47 +1,160 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
-from app.modules.products.schemas import ProductCreate, ProductUpdate, ProductResponse
+from app.core.http_cache import make_etag, is_not_modified, not_modified, set_cache_headers
+from app.core.responses import ORJSONResponse
+from app.core.streaming import aiter_lines
+from app.modules.products.schemas import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductPage, ProductSearchPage, BulkImportResult,
+)
 from app.modules.products import service
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
 @router.post("/", response_model=ProductResponse)
-def create_product(
+async def create_product(
     data: ProductCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user), 
 ):
-    return service.create_product(db=db, data=data, user_id=user_id)
+    return await service.create_product(db=db, data=data, user_id=user_id)
 
 
-@router.get("/", response_model=list[ProductResponse])
-def get_all_products(db: Session = Depends(get_db)):
-    return service.get_products(db=db)
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_products(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user),
+):
+    """
+    POST /products/bulk — create many products from a CSV (with header) or
+    NDJSON body, streamed. Format comes from ?format= or the Content-Type.
+    Returns counts and the rows that were rejected.
+    """
+    if fmt is None:
+        fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    return await service.import_products(db=db, lines=aiter_lines(request.stream()), fmt=fmt, user_id=user_id)
+
+
+@router.get("/export")
+async def export_products(
+    fmt: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    created_by: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user),
+):
+    """GET /products/export — the whole catalog (or one seller's) as a CSV/NDJSON download."""
+    return StreamingResponse(
+        service.export_products(db=db, fmt=fmt, created_by=created_by),
+        media_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="products.{fmt}"'},
+    )
+
+
+@router.get("/", response_model=ProductPage)
+async def get_all_products(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    in_stock: bool = False,
+    created_by: Optional[int] = None,
+    fields: Optional[str] = Query(None, pattern="^(summary|full)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """GET /products — one page of products, newest first. `fields=summary` skips descriptions."""
+    rows, next_cursor = await service.get_products(
+        db=db,
+        limit=limit,
+        cursor=cursor,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        created_by=created_by,
+        include_description=fields != "summary",
+    )
+
+    # The page changes iff one of its rows (or the page boundary) does
+    etag = make_etag(request.url.query, next_cursor, *((row.id, row.updated_at) for row in rows))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    # Rows already have ProductResponse's keys: serialize them as they are
+    response = ORJSONResponse({"items": [row._asdict() for row in rows], "next_cursor": next_cursor})
+    set_cache_headers(response, etag)
+    return response
+
+
+@router.get("/search", response_model=ProductSearchPage)
+async def search_products(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    fields: Optional[str] = Query(None, pattern="^(summary|full)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    GET /products/search?q= — best matches first. Words match as prefixes,
+    so `fields=summary` (no descriptions) makes a light typeahead call.
+    """
+    rows, next_offset = await service.search_products(
+        db=db,
+        q=q,
+        limit=limit,
+        offset=offset,
+        include_description=fields != "summary",
+    )
+
+    etag = make_etag(request.url.query, next_offset, *((row.id, row.updated_at) for row in rows))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    response = ORJSONResponse({"items": [row._asdict() for row in rows], "next_offset": next_offset})
+    set_cache_headers(response, etag)
+    return response
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    return service.get_product(db=db, product_id=product_id)
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    # Served from the product cache when warm, so a 304 needs no DB round trip
+    product = await service.get_product(db=db, product_id=product_id)
+
+    etag = make_etag(product["id"], product["updated_at"])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    set_cache_headers(response, etag)
+    return product
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
-def update_product(
+async def update_product(
     product_id: int,
     data: ProductUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user),
 ):
-    return service.update_product(db=db, product_id=product_id, data=data, user_id=user_id)
+    return await service.update_product(db=db, product_id=product_id, data=data, user_id=user_id)
 
 
 @router.delete("/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user),
 ):
-    service.delete_product(db=db, product_id=product_id, user_id = user_id)
+    await service.delete_product(db=db, product_id=product_id, user_id = user_id)
     return {"message": "Product deleted"}
\ No newline at end of file
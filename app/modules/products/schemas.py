@@ -1,19 +1,20 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from app.core.money import Money
 
 
 class ProductCreate(BaseModel):
     name: str
     description: Optional[str] = None
-    price: float
+    price: Money
     stock: int = 0
 
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
-    price: Optional[float] = None
+    price: Optional[Money] = None
     stock: Optional[int] = None
 
 
@@ -21,10 +22,32 @@ class ProductResponse(BaseModel):
     id: int
     name: str
     description: Optional[str] = None
-    price: float
+    price: Money
     stock: int
     created_by: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ProductPage(BaseModel):
+    items: list[ProductResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to get the next page
+
+
+class ProductSearchPage(BaseModel):
+    items: list[ProductResponse]  # best match first
+    next_offset: Optional[int] = None  # pass back as ?offset= for more results
+
+
+class BulkRowError(BaseModel):
+    row: int    # 1-based data row (CSV header and blank lines not counted)
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[BulkRowError]  # the first BULK_IMPORT_MAX_ERRORS failures
@@ -1,10 +1,51 @@
-from sqlalchemy.orm import Session
+import json
+import re
+import tempfile
+from decimal import Decimal
+from itertools import islice
+from typing import AsyncIterator, Iterable, Optional
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update, case, func, column, literal_column, null, table
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.core.pagination import encode_cursor, before_cursor
+from app.core.streaming import aiter_csv_records, csv_line
 from app.modules.products.models import Product
-from app.modules.products.schemas import ProductCreate, ProductUpdate
+from app.modules.products.schemas import ProductCreate, ProductUpdate, ProductResponse, BulkImportResult, BulkRowError
 
+# Read-through cache for single-product reads. Display only: stock checks
+# that matter (add to cart, checkout) always read the database.
+product_cache = build_cache(
+    "product",
+    backend=settings.CACHE_BACKEND,
+    ttl=settings.PRODUCT_CACHE_TTL,
+    maxsize=settings.PRODUCT_CACHE_SIZE,
+    redis_url=settings.REDIS_URL,
+)
 
-def create_product(db: Session, data: ProductCreate, user_id: int) -> Product:
+# Columns every list view needs. `description` is an unbounded Text blob,
+# so it is only selected when the caller asks for it.
+LIST_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.price,
+    Product.stock,
+    Product.created_by,
+    Product.created_at,
+    Product.updated_at,
+)
+
+
+def _list_columns(include_description: bool) -> tuple:
+    # Summary rows carry a NULL description, so every row has ProductResponse's keys
+    description = Product.description if include_description else null().label("description")
+    return LIST_COLUMNS + (description,)
+
+
+async def create_product(db: AsyncSession, data: ProductCreate, user_id: int) -> Product:
     product = Product(
         name=data.name,
         description=data.description,
@@ -13,13 +54,151 @@ def create_product(db: Session, data: ProductCreate, user_id: int) -> Product:
         created_by=user_id,      # NEW — link product to creator
     )
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
     return product
 
 
-def update_product(db: Session, product_id: int, data: ProductUpdate, user_id: int) -> Product:
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def _import_rows(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple[int, dict | str]]:
+    """(row number, field dict or parse error) for each data row."""
+    row_number = 0
+    if fmt == "csv":
+        header = None
+        async for record in aiter_csv_records(lines):
+            if header is None:
+                header = [name.strip() for name in record]
+                continue
+            row_number += 1
+            if len(record) != len(header):
+                yield row_number, f"expected {len(header)} columns, got {len(record)}"
+            else:
+                # Empty cells mean "not given", so schema defaults apply
+                yield row_number, {name: value for name, value in zip(header, record) if value != ""}
+        return
+
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"invalid JSON: {e}"
+            continue
+        yield row_number, data if isinstance(data, dict) else "expected a JSON object"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+
+
+# Validated import rows wait here until the upload is complete; past this
+# many bytes the spool moves from memory to a temp file
+IMPORT_SPOOL_MEMORY = 8 * 1024 * 1024
+
+
+def _spool_rows(spool, rows: list[dict]) -> None:
+    spool.writelines(json.dumps(row, default=str) + "\n" for row in rows)  # Decimal as "19.99"
+
+
+def _read_spooled(spool, size: int) -> list[dict]:
+    return [json.loads(line) for line in islice(spool, size)]
+
+
+async def import_products(db: AsyncSession, lines: AsyncIterator[str], fmt: str, user_id: int) -> BulkImportResult:
+    """
+    Create products from a CSV (with header) or NDJSON line stream. Rows
+    are validated with ProductCreate as they arrive; invalid rows are
+    skipped and reported. Valid rows are spooled until the body has been
+    read, then inserted a chunk at a time with multi-row INSERTs in one
+    short transaction: a failed upload imports nothing, and no write
+    transaction stays open for as long as the client takes to send.
+    """
+    imported, failed, errors, chunk = 0, 0, [], []
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MEMORY, mode="w+", encoding="utf-8") as spool:
+        async for row_number, data in _import_rows(lines, fmt):
+            if row_number > settings.BULK_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"At most {settings.BULK_IMPORT_MAX_ROWS} rows per upload"
+                )
+
+            if isinstance(data, dict):
+                try:
+                    product = ProductCreate.model_validate(data)
+                except ValidationError as e:
+                    data = _validation_message(e)
+                else:
+                    chunk.append({**product.model_dump(), "created_by": user_id})
+
+            if isinstance(data, str):
+                failed += 1
+                if len(errors) < settings.BULK_IMPORT_MAX_ERRORS:
+                    errors.append(BulkRowError(row=row_number, error=data))
+
+            if len(chunk) >= settings.BULK_IMPORT_CHUNK_SIZE:
+                await run_in_threadpool(_spool_rows, spool, chunk)
+                imported += len(chunk)
+                chunk = []
+
+        await run_in_threadpool(_spool_rows, spool, chunk)
+        imported += len(chunk)
+
+        spool.seek(0)
+        while rows := await run_in_threadpool(_read_spooled, spool, settings.BULK_IMPORT_CHUNK_SIZE):
+            await db.execute(insert(Product), rows)
+        await db.commit()
+
+    return BulkImportResult(imported=imported, failed=failed, errors=errors)
+
+
+EXPORT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.stock,
+    Product.created_by,
+    Product.created_at,
+    Product.updated_at,
+)
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_record(row) -> dict:
+    record = row._asdict()
+    for key in ("created_at", "updated_at"):
+        if record[key] is not None:
+            record[key] = record[key].isoformat()
+    return record
+
+
+async def export_products(db: AsyncSession, fmt: str, created_by: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    The catalog as CSV or NDJSON, in id order. Rows come through a
+    server-side cursor a batch at a time, so memory use doesn't grow with
+    the catalog.
+    """
+    query = select(*EXPORT_COLUMNS).order_by(Product.id)
+    if created_by is not None:
+        query = query.where(Product.created_by == created_by)
+
+    if fmt == "csv":
+        yield csv_line([c.key for c in EXPORT_COLUMNS])
+
+    result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for rows in result.partitions():
+        records = [_export_record(row) for row in rows]
+        if fmt == "csv":
+            yield "".join(csv_line(list(record.values())) for record in records)
+        else:
+            # default=float: prices are JSON numbers, as everywhere else in the API
+            yield "".join(json.dumps(record, default=float) + "\n" for record in records)
+
+
+async def update_product(db: AsyncSession, product_id: int, data: ProductUpdate, user_id: int) -> Product:
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -31,33 +210,183 @@ def update_product(db: Session, product_id: int, data: ProductUpdate, user_id: i
     for field, value in update_data.items():
         setattr(product, field, value)
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await invalidate_products([product_id])
     return product
 
 
-def delete_product(db: Session, product_id: int, user_id: int) -> None:
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def delete_product(db: AsyncSession, product_id: int, user_id: int) -> None:
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     if product.created_by != user_id:
         raise HTTPException(status_code=403, detail="Not your product")
 
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.commit()
+    await invalidate_products([product_id])
 
 
-def get_products(db: Session) -> list[Product]:
-    return db.query(Product).all()
+async def invalidate_products(product_ids: Iterable[int]) -> None:
+    """Drop cached copies. Call after the change is committed."""
+    await product_cache.delete_many(str(product_id) for product_id in product_ids)
 
 
-def get_product(db: Session, product_id: int) -> Product:
-    product = db.query(Product).filter(Product.id == product_id).first()
+# ─── Inventory ───────────────────────────────────────────────
+# Stock only ever changes through these set-based UPDATEs: the condition
+# and the arithmetic run in the database, so there is no read-modify-write
+# window for concurrent buyers to oversell through. Rows are locked in id
+# order inside the statement, so multi-product updates can't deadlock.
+# Held stock lives on PENDING orders (their items, until reserved_until).
+
+
+def _locked_ids(quantities: dict[int, int]):
+    return select(Product.id).where(Product.id.in_(quantities)).order_by(Product.id).with_for_update()
+
+
+async def reserve_stock(db: AsyncSession, quantities: dict[int, int]) -> bool:
+    """
+    Take `quantities` ({product_id: qty}) out of stock, all or nothing:
+    UPDATE ... SET stock = stock - q WHERE stock >= q. Returns False if any
+    line fell short; the caller must then roll back.
+    """
+    requested = case(quantities, value=Product.id)
+    result = await db.execute(
+        update(Product)
+        .where(Product.id.in_(_locked_ids(quantities)), Product.stock >= requested)
+        .values(stock=Product.stock - requested)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(quantities)
+
+
+async def return_stock(db: AsyncSession, quantities: dict[int, int]) -> None:
+    """Put released holds back: UPDATE ... SET stock = stock + q."""
+    if quantities:
+        await db.execute(
+            update(Product)
+            .where(Product.id.in_(_locked_ids(quantities)))
+            .values(stock=Product.stock + case(quantities, value=Product.id))
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def get_products(
+    db: AsyncSession,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    in_stock: bool = False,
+    created_by: Optional[int] = None,
+    include_description: bool = True,
+) -> tuple[list, Optional[str]]:
+    """
+    Newest-first product listing with keyset pagination on (created_at, id).
+    Unlike OFFSET, every page costs the same no matter how deep you go.
+    Returns the page's rows and the cursor for the next page.
+    """
+    columns = _list_columns(include_description)
+    query = select(*columns)
+
+    if min_price is not None:
+        query = query.where(Product.price >= min_price)
+    if max_price is not None:
+        query = query.where(Product.price <= max_price)
+    if in_stock:
+        query = query.where(Product.stock > 0)
+    if created_by is not None:
+        query = query.where(Product.created_by == created_by)
+
+    if cursor:
+        query = query.where(before_cursor(Product.created_at, Product.id, cursor))
+
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(
+        query.order_by(Product.created_at.desc(), Product.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
+
+
+SEARCH_MAX_TERMS = 8
+products_fts = table("products_fts", column("rowid"))
+
+
+def _search_terms(q: str) -> list[str]:
+    """Words in the query, lowercased; punctuation can't reach the query syntax."""
+    return re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+
+
+async def search_products(
+    db: AsyncSession,
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    include_description: bool = True,
+) -> tuple[list, Optional[int]]:
+    """
+    Ranked full-text search over name and description. Every word matches
+    as a prefix ("wire head" finds "Wireless Headphones"), so it doubles as
+    typeahead. Returns the page's rows and the offset of the next page.
+    """
+    terms = _search_terms(q)
+    if not terms:
+        return [], None
+
+    columns = _list_columns(include_description)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        search_vector = literal_column("products.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        query = (
+            select(*columns)
+            .where(search_vector.op("@@")(tsquery))
+            .order_by(func.ts_rank_cd(search_vector, tsquery).desc(), Product.id.desc())
+        )
+    elif dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        query = (
+            select(*columns)
+            .join(products_fts, products_fts.c.rowid == Product.id)
+            .where(literal_column("products_fts").op("MATCH")(match))
+            .order_by(func.bm25(literal_column("products_fts")), Product.id.desc())
+        )
+    else:
+        # No search index on this backend: unranked substring scan
+        query = select(*columns).order_by(Product.id.desc())
+        for term in terms:
+            query = query.where(Product.name.ilike(f"%{term}%") | Product.description.ilike(f"%{term}%"))
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.limit(limit + 1).offset(offset))).all()
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+    return rows, next_offset
+
+
+async def get_product(db: AsyncSession, product_id: int) -> dict:
+    cached = await product_cache.get(str(product_id))
+    if cached is not None:
+        return cached
+
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return product
+
+    data = ProductResponse.model_validate(product).model_dump(mode="json")
+    await product_cache.set(str(product_id), data)
+    return data
 
@@ -0,0 +1,113 @@
+"""
+Requests/sec of the async stack vs the previous sync stack, at high concurrency.
+
+Both apps serve GET /products/{id} from the same SQLite file:
+    - sync:  `def` endpoint + sync Session (runs in Starlette's threadpool)
+    - async: the real app router + AsyncSession via aiosqlite
+
+The product cache is off unless CACHE_BACKEND is set, so both sides hit
+the database on every request (benchmarks.product_cache measures the cache).
+
+Usage:
+    python -m benchmarks.async_vs_sync --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_async_vs_sync.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.database import Base, engine as async_engine
+from app.modules.auth.models import User
+from app.modules.products.models import Product
+from app.modules.products.router import router as product_router
+from app.modules.products.schemas import ProductResponse
+import app.modules.cart.models  # noqa: F401 — register remaining tables
+import app.modules.payments.models  # noqa: F401
+
+PRODUCT_COUNT = 1000
+
+
+def seed(sync_engine) -> None:
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        db.add_all(
+            Product(name=f"Product {i}", description="x" * 500, price=9.99, stock=100, created_by=1)
+            for i in range(PRODUCT_COUNT)
+        )
+        db.commit()
+
+
+def build_sync_app(sync_engine) -> FastAPI:
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+
+    def get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/products/{product_id}", response_model=ProductResponse)
+    def get_product(product_id: int, db: Session = Depends(get_db)):
+        return db.query(Product).filter(Product.id == product_id).first()
+
+    return sync_app
+
+
+def build_async_app() -> FastAPI:
+    async_app = FastAPI()
+    async_app.include_router(product_router)
+    return async_app
+
+
+async def drive(app: FastAPI, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(f"/products/{random.randint(1, PRODUCT_COUNT)}")
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    sync_engine = create_engine(f"sqlite:///{DB_PATH}", pool_size=concurrency)
+    seed(sync_engine)
+
+    sync_rps = await drive(build_sync_app(sync_engine), requests, concurrency)
+    async_rps = await drive(build_async_app(), requests, concurrency)
+
+    print(f"requests={requests} concurrency={concurrency}")
+    print(f"sync  stack: {sync_rps:8.1f} req/s")
+    print(f"async stack: {async_rps:8.1f} req/s  ({async_rps / sync_rps:.2f}x)")
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,95 @@
+"""
+Flash sale: --buyers concurrent checkouts racing for one SKU.
+
+Every buyer has one unit of the same product in their cart and calls
+payments.service.checkout (mock gateway) at once; there are only --stock
+units. Reports checkouts per second, how many sold, how many were turned
+away, and the oversell count (units sold beyond stock, must be 0), and
+cross-checks the final stock column against the orders that hold it.
+
+SQLite allows one writer at a time, so "database is locked" outcomes at
+high concurrency are SQLite's, not the app's; point DATABASE_URL at
+Postgres for representative numbers.
+
+Usage:
+    python -m benchmarks.flash_sale --buyers 1000 --stock 100
+    DATABASE_URL=postgresql://... python -m benchmarks.flash_sale
+"""
+import argparse
+import asyncio
+import collections
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_flash_sale.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+
+from app.core.database import Base, SessionLocal, engine
+from app.modules.auth.models import User
+from app.modules.cart.models import Cart, CartItem
+from app.modules.payments import service
+from app.modules.payments.gateway import MockGateway
+from app.modules.payments.models import Order, OrderItem, OrderStatus
+from app.modules.products.models import Product
+
+
+async def seed(buyers: int, stock: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"id": i, "username": f"buyer{i}", "email": f"buyer{i}@example.com", "hashed_password": "x"}
+            for i in range(1, buyers + 1)
+        ])
+        await conn.execute(insert(Product), [{"id": 1, "name": "Hot SKU", "price": 9.99, "stock": stock, "created_by": 1}])
+        await conn.execute(insert(Cart), [{"id": i, "user_id": i} for i in range(1, buyers + 1)])
+        await conn.execute(insert(CartItem), [
+            {"cart_id": i, "product_id": 1, "quantity": 1} for i in range(1, buyers + 1)
+        ])
+
+
+async def main(buyers: int, stock: int) -> None:
+    await seed(buyers, stock)
+    gateway = MockGateway()
+    outcomes = collections.Counter()
+
+    async def buy(user_id: int) -> None:
+        try:
+            async with SessionLocal() as db:
+                await service.checkout(db, user_id, gateway)
+            outcomes["sold"] += 1
+        except HTTPException as e:
+            outcomes[f"http_{e.status_code}"] += 1
+        except Exception as e:
+            outcomes[type(e).__name__] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buy(user_id) for user_id in range(1, buyers + 1)))
+    elapsed = time.perf_counter() - started
+
+    async with SessionLocal() as db:
+        left = await db.scalar(select(Product.stock).where(Product.id == 1))
+        held = await db.scalar(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.status != OrderStatus.FAILED)
+        )
+
+    print(f"buyers={buyers} stock={stock}")
+    print(f"{buyers / elapsed:8.0f} checkouts/s   {dict(outcomes)}")
+    print(f"oversold {max(0, held - stock)}   stock left {left}   "
+          f"ledger {'ok' if left + held == stock else 'MISMATCH'}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.buyers, args.stock))
@@ -0,0 +1,41 @@
+"""
+Per-request cost of authenticating a bearer token: full JWT verification
+(the old behaviour) vs the verified-token cache, for each JWT backend.
+
+Usage:
+    python -m benchmarks.jwt_decode --iterations 20000
+"""
+import argparse
+import importlib.util
+import time
+
+from app.core import security
+from app.core.config import settings
+
+
+def per_call_us(fn, token: str, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(token)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(iterations: int) -> None:
+    token = security.create_access_token({"user_id": 1})
+    backends = ["jose"] + (["pyjwt"] if importlib.util.find_spec("jwt") else [])
+
+    print(f"iterations={iterations}")
+    for backend in backends:
+        settings.JWT_BACKEND = backend
+        security.token_cache.clear()
+
+        uncached = per_call_us(security.verify_access_token, token, iterations)
+        cached = per_call_us(security.decode_access_token, token, iterations)
+        print(f"{backend:>6}: verify {uncached:7.1f} µs/req   cached {cached:6.2f} µs/req   ({uncached / cached:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
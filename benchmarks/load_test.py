@@ -0,0 +1,302 @@
+"""
+Load test: a weighted mix of user journeys against the full app.
+
+Seeds --users users (some with a filled cart) and --products products,
+then runs --sessions journeys through the real ASGI app (middleware,
+auth, MockGateway for payments) with --concurrency in flight:
+
+    browse    product list (maybe its next page), two product pages, a search
+    cart      a product page, add to cart, view cart
+    checkout  add to cart, check out
+    history   order history
+    login     password login (bcrypt at its minimum cost)
+
+Reports throughput, and per route p50/p95/p99 and SQL statements per
+request, read from the Server-Timing header. --save writes the result as
+JSON; --compare checks a run against a saved baseline and exits with 1 on
+a regression: p95 or throughput worse than --tolerance, or any route
+running more queries per request than before. Journeys and their inputs
+come from --seed, so two runs issue the same requests.
+
+Compare runs on the same machine and database only. SQLite allows one
+writer at a time, so checkouts queue on it; point DATABASE_URL at a
+throwaway Postgres for representative numbers.
+
+Usage:
+    python -m benchmarks.load_test --users 10000 --products 10000 --sessions 5000
+    python -m benchmarks.load_test --save baseline.json
+    python -m benchmarks.load_test --compare baseline.json
+    python -m benchmarks.load_test --mix browse=1,checkout=1
+    DATABASE_URL=postgresql://... python -m benchmarks.load_test
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_load_test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_QUEUE_TIMEOUT", "60")
+os.environ["MULTICARD_APP_ID"] = ""  # always the mock gateway
+
+import httpx
+from sqlalchemy import insert
+
+from app.core.database import Base, engine
+from app.core.security import create_access_token, hash_password
+from app.main import app
+from app.modules.auth.models import User
+from app.modules.cart.models import Cart, CartItem
+from app.modules.products.models import Product
+
+PASSWORD = "bench-password"
+WORDS = ["red", "blue", "green", "cotton", "wool", "leather", "shirt", "jacket", "shoes", "bag", "hat", "scarf"]
+DEFAULT_MIX = {"browse": 60, "cart": 20, "checkout": 8, "history": 10, "login": 2}
+SEED_CHUNK = 10000
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+async def seed(users: int, products: int, cart_ratio: float) -> None:
+    hashed = hash_password(PASSWORD)
+    rng = random.Random(0)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(1, users + 1, SEED_CHUNK):
+            stop = min(start + SEED_CHUNK, users + 1)
+            await conn.execute(insert(User), [
+                {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": hashed}
+                for i in range(start, stop)
+            ])
+        for start in range(1, products + 1, SEED_CHUNK):
+            stop = min(start + SEED_CHUNK, products + 1)
+            await conn.execute(insert(Product), [
+                {
+                    "id": i,
+                    "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                    "description": " ".join(rng.choices(WORDS, k=40)),
+                    "price": rng.randint(100, 100000) / 100,
+                    "stock": 1_000_000,
+                    "created_by": 1,
+                }
+                for i in range(start, stop)
+            ])
+        carts = int(users * cart_ratio)
+        if carts:
+            await conn.execute(insert(Cart), [{"id": i, "user_id": i} for i in range(1, carts + 1)])
+            await conn.execute(insert(CartItem), [
+                {"cart_id": i, "product_id": rng.randint(1, products), "quantity": rng.randint(1, 3)}
+                for i in range(1, carts + 1)
+                for _ in range(rng.randint(1, 3))
+            ])
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = collections.defaultdict(list)
+        self.queries: dict[str, list[int]] = collections.defaultdict(list)
+        self.errors: collections.Counter = collections.Counter()
+
+    def record(self, route: str, response: httpx.Response, elapsed: float) -> None:
+        self.latencies[route].append(elapsed * 1000)
+        match = QUERIES.search(response.headers.get("server-timing", ""))
+        if match:
+            self.queries[route].append(int(match.group(1)))
+        if response.status_code >= 400:
+            self.errors[f"{route} {response.status_code}"] += 1
+
+
+class Session:
+    """One journey: a user, their token, and a client that records every call."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, users: int, products: int):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.products = products
+        self.user_id = rng.randint(1, users)
+        self.headers = {"Authorization": f"Bearer {create_access_token({'user_id': self.user_id})}"}
+
+    async def call(self, method: str, route: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.recorder.record(f"{method} {route}", response, time.perf_counter() - started)
+        return response
+
+    def product_id(self) -> int:
+        # Skewed popularity: a few products get most of the traffic
+        return min(self.products, int(self.rng.paretovariate(1.2)))
+
+    async def browse(self):
+        page = await self.call("GET", "/products/", "/products/", params={"limit": 20})
+        if self.rng.random() < 0.5:
+            params = {"limit": 20, "cursor": page.json()["next_cursor"]}
+            await self.call("GET", "/products/", "/products/", params=params)
+        for _ in range(2):
+            product_id = self.product_id()
+            await self.call("GET", "/products/{product_id}", f"/products/{product_id}")
+        await self.call("GET", "/products/search", "/products/search", params={"q": self.rng.choice(WORDS)})
+
+    async def cart(self):
+        product_id = self.product_id()
+        await self.call("GET", "/products/{product_id}", f"/products/{product_id}")
+        await self.call("POST", "/cart/", "/cart/", json={"product_id": product_id, "quantity": 1}, headers=self.headers)
+        await self.call("GET", "/cart/", "/cart/", headers=self.headers)
+
+    async def checkout(self):
+        await self.call("POST", "/cart/", "/cart/", json={"product_id": self.product_id(), "quantity": 1}, headers=self.headers)
+        await self.call("POST", "/checkout/", "/checkout/", headers=self.headers)
+
+    async def history(self):
+        await self.call("GET", "/checkout/orders", "/checkout/orders", headers=self.headers)
+
+    async def login(self):
+        await self.call("POST", "/auth/login", "/auth/login", json={"username": f"user{self.user_id}", "password": PASSWORD})
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100)[int(pct) - 1]
+
+
+async def run(sessions: int, concurrency: int, mix: dict[str, int], seed: int, users: int, products: int) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    journeys = rng.choices(list(mix), weights=list(mix.values()), k=sessions)
+    semaphore = asyncio.Semaphore(concurrency)
+    # raise_app_exceptions=False: a 500 is a result to count, not a crash
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(index: int, journey: str):
+            async with semaphore:
+                session = Session(client, recorder, random.Random(seed * 1_000_003 + index), users, products)
+                await getattr(session, journey)()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index, journey) for index, journey in enumerate(journeys)))
+        return recorder, time.perf_counter() - started
+
+
+def summarize(recorder: Recorder, elapsed: float, args) -> dict:
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        queries = recorder.queries.get(route, [])
+        routes[route] = {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries_per_request": round(statistics.fmean(queries), 2) if queries else 0.0,
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "config": {
+            "users": args.users, "products": args.products, "cart_ratio": args.cart_ratio,
+            "sessions": args.sessions, "concurrency": args.concurrency, "seed": args.seed, "mix": args.mix,
+            "dialect": engine.dialect.name, "python": platform.python_version(),
+        },
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "errors": dict(recorder.errors),
+        "routes": routes,
+    }
+
+
+def report(result: dict) -> None:
+    print(f"{result['requests']} requests in {result['seconds']:.1f}s = {result['rps']:.1f} req/s "
+          f"({result['config']['dialect']}, concurrency {result['config']['concurrency']})")
+    print(f"{'route':<30} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/req':>6}")
+    for route, stats in result["routes"].items():
+        print(f"{route:<30} {stats['requests']:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['queries_per_request']:>6.2f}")
+    if result["errors"]:
+        print(f"errors: {result['errors']}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions against `baseline`, printed alongside the deltas."""
+    regressions = []
+    if result["config"] != baseline["config"]:
+        print(f"warning: config differs from the baseline's {baseline['config']}")
+
+    change = result["rps"] / baseline["rps"] - 1
+    print(f"\nvs baseline: throughput {change:+.1%}")
+    if change < -tolerance:
+        regressions.append(f"throughput {baseline['rps']} -> {result['rps']} req/s")
+
+    for route, stats in result["routes"].items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        p95_change = stats["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        print(f"  {route:<30} p95 {p95_change:+7.1%}   q/req {before['queries_per_request']:.2f} -> {stats['queries_per_request']:.2f}")
+        if p95_change > tolerance:
+            regressions.append(f"{route} p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+        # Query counts are deterministic for a given seed, so any growth is real
+        if stats["queries_per_request"] > before["queries_per_request"] + 0.05:
+            regressions.append(f"{route} queries/request {before['queries_per_request']} -> {stats['queries_per_request']}")
+    return regressions
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Session, name):
+            raise argparse.ArgumentTypeError(f"unknown journey {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def main(args) -> int:
+    await seed(args.users, args.products, args.cart_ratio)
+    mix = parse_mix(args.mix)
+    # The lifespan builds the gateway and runs the background tasks, as in production
+    async with app.router.lifespan_context(app):
+        if args.warmup:
+            await run(args.warmup, args.concurrency, mix, args.seed + 1, args.users, args.products)
+        recorder, elapsed = await run(args.sessions, args.concurrency, mix, args.seed, args.users, args.products)
+    result = summarize(recorder, elapsed, args)
+    report(result)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nsaved to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nno regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--cart-ratio", type=float, default=0.3, help="share of users seeded with a filled cart")
+    parser.add_argument("--sessions", type=int, default=2000, help="journeys to run")
+    parser.add_argument("--warmup", type=int, default=200, help="journeys run first and not measured")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", metavar="PATH", help="write the result as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput regression, as a fraction")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,82 @@
+"""
+Latency of GET /products/{id} reads with and without the product cache.
+
+Reads follow a skewed (Zipf-like) popularity curve, like real catalog
+traffic, through products.service.get_product with a fresh session per
+request. Reports p50/p99 per mode and the cache hit ratio.
+
+Usage:
+    python -m benchmarks.product_cache --products 10000 --reads 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_product_cache.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import insert
+
+from app.core.cache import CACHE_HITS, CACHE_MISSES, MemoryCache, NullCache
+from app.core.database import Base, SessionLocal, engine
+from app.modules.auth.models import User
+from app.modules.products import service
+from app.modules.products.models import Product
+import app.modules.cart.models  # noqa: F401 — register remaining tables
+import app.modules.payments.models  # noqa: F401
+
+
+async def seed(products: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        await conn.execute(insert(Product), [
+            {"name": f"Product {i}", "description": "x" * 500, "price": 9.99, "stock": 100, "created_by": 1}
+            for i in range(products)
+        ])
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(pct) - 1]
+
+
+async def measure(ids: list[int]) -> list[float]:
+    latencies = []
+    for product_id in ids:
+        started = time.perf_counter()
+        async with SessionLocal() as db:
+            await service.get_product(db, product_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(products: int, reads: int) -> None:
+    await seed(products)
+    weights = [1 / rank for rank in range(1, products + 1)]
+    ids = random.choices(range(1, products + 1), weights=weights, k=reads)
+
+    service.product_cache = NullCache("product", ttl=0)
+    uncached = await measure(ids)
+
+    service.product_cache = MemoryCache("product", ttl=60, maxsize=products)
+    cached = await measure(ids)
+    hits, misses = CACHE_HITS.get(cache="product"), CACHE_MISSES.get(cache="product")
+
+    print(f"products={products} reads={reads}")
+    print(f"no cache: p50 {percentile(uncached, 50):6.3f} ms   p99 {percentile(uncached, 99):6.3f} ms")
+    print(f"cache:    p50 {percentile(cached, 50):6.3f} ms   p99 {percentile(cached, 99):6.3f} ms   hit ratio {hits / (hits + misses):.1%}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.reads))
@@ -0,0 +1,139 @@
+"""
+Latency of GET /products/search against a large synthetic catalog.
+
+Seeds --products rows with names and descriptions drawn from a 20k-word
+synthetic vocabulary with a long tail (the search index is maintained as
+rows go in), then runs --queries searches through
+products.service.search_products: single words, two-word queries and
+3-5 letter typeahead prefixes, popular terms more often than rare ones. Reports
+p50/p95/p99 per query kind, plus a LIKE '%term%' scan for comparison.
+The scan is unranked and stops at the first page of hits, so it is only
+cheap for popular words; rare ones read the whole table. Popular words
+are where ranked search works hardest, since every hit gets scored.
+
+Usage:
+    python -m benchmarks.search_latency --products 1000000 --queries 1000
+    DATABASE_URL=postgresql://... python -m benchmarks.search_latency
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_search_latency.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import insert, select
+
+from app.core.database import Base, SessionLocal, engine
+from app.modules.auth.models import User
+from app.modules.products import service
+from app.modules.products.models import Product
+import app.modules.cart.models  # noqa: F401 — register remaining tables
+import app.modules.payments.models  # noqa: F401
+
+SEED_CHUNK = 10000
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "bar", "den", "fix", "gor", "hul", "pin", "tek"]
+VOCABULARY_SIZE = 20000
+
+
+def vocabulary() -> list[str]:
+    """Pseudo-words with a long tail, like real product text: few common, most rare."""
+    rng = random.Random(1)
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+WORDS = vocabulary()
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(WORDS) + 1)))
+
+
+def product_text(rng: random.Random) -> tuple[str, str]:
+    name = " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=3))
+    description = " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=20))
+    return name, description
+
+
+async def seed(products: int) -> None:
+    rng = random.Random(42)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        for start in range(0, products, SEED_CHUNK):
+            rows = []
+            for _ in range(start, min(start + SEED_CHUNK, products)):
+                name, description = product_text(rng)
+                rows.append({"name": name, "description": description, "price": 9.99, "stock": 10, "created_by": 1})
+            await conn.execute(insert(Product), rows)
+
+
+def make_queries(queries: int) -> dict[str, list[str]]:
+    rng = random.Random(7)
+    return {
+        "word": rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=queries),
+        "two words": [" ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=2)) for _ in range(queries)],
+        "prefix": [word[:rng.choice((3, 4, 5))] for word in rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=queries)],
+    }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(pct) - 1]
+
+
+async def measure(run, queries: list[str]) -> list[float]:
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        async with SessionLocal() as db:
+            await run(db, q)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def like_scan(db, q: str) -> None:
+    pattern = f"%{q}%"
+    await db.execute(
+        select(*service.LIST_COLUMNS)
+        .where(Product.name.ilike(pattern) | Product.description.ilike(pattern))
+        .order_by(Product.id.desc())
+        .limit(21)
+    )
+
+
+async def main(products: int, queries: int, skip_seed: bool) -> None:
+    if not skip_seed:
+        started = time.perf_counter()
+        await seed(products)
+        print(f"seeded {products} products in {time.perf_counter() - started:.0f}s")
+
+    async def search(db, q):
+        await service.search_products(db, q, limit=20, include_description=False)
+
+    print(f"products={products} queries={queries} per kind")
+    for kind, qs in make_queries(queries).items():
+        latencies = await measure(search, qs)
+        print(f"search {kind:<10} p50 {percentile(latencies, 50):8.2f} ms   "
+              f"p95 {percentile(latencies, 95):8.2f} ms   p99 {percentile(latencies, 99):8.2f} ms")
+
+    # The scan is slow at scale; a handful of queries is enough to show it
+    latencies = await measure(like_scan, make_queries(max(queries // 20, 5))["word"])
+    print(f"LIKE scan  word       p50 {percentile(latencies, 50):8.2f} ms   "
+          f"p95 {percentile(latencies, 95):8.2f} ms   p99 {percentile(latencies, 99):8.2f} ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the catalog from the previous run")
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.queries, args.skip_seed))
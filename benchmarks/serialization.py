@@ -0,0 +1,153 @@
+"""
+Per-item cost of turning a list endpoint's rows into JSON bytes.
+
+    before  what list endpoints did: build a pydantic model per item, then
+            FastAPI's response_model pass (validate the result again, dump
+            it in JSON mode) and stdlib json rendering
+    after   plain dicts from row tuples, rendered by ORJSONResponse
+
+Run for product pages, order history (3 line items per order) and carts,
+at each --sizes. Inputs are dicts, as a query's rows become with
+`row._asdict()`, so the database is not involved.
+
+Usage:
+    python -m benchmarks.serialization --sizes 1000 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from starlette.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.responses import ORJSONResponse
+from app.modules.cart.schemas import CartItemResponse, CartResponse
+from app.modules.payments.schemas import OrderItemResponse, OrderPage, OrderResponse
+from app.modules.products.schemas import ProductPage, ProductResponse
+
+
+def price() -> Decimal:
+    return Decimal(random.randint(100, 100000)) / 100
+
+
+def product_rows(n: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": i, "name": f"Product {i}", "price": price(), "stock": 100, "created_by": 1,
+            "created_at": now - timedelta(minutes=i), "updated_at": now, "description": "x" * 200,
+        }
+        for i in range(n)
+    ]
+
+
+def order_rows(n: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    orders = []
+    for i in range(n):
+        items = []
+        for j in range(3):
+            unit = price()
+            items.append({
+                "id": i * 3 + j, "product_id": j, "product_name": f"Product {j}",
+                "product_price": unit, "quantity": 2, "subtotal": unit * 2,
+            })
+        orders.append({
+            "id": i, "total_price": sum(item["subtotal"] for item in items),
+            "status": "paid", "items": items, "created_at": now,
+        })
+    return orders
+
+
+def cart_rows(n: int) -> list[dict]:
+    rows = []
+    for i in range(n):
+        unit = price()
+        rows.append({
+            "id": i, "product_id": i, "product_name": f"Product {i}",
+            "product_price": unit, "quantity": 1, "subtotal": unit,
+        })
+    return rows
+
+
+def render_via_response_model(model: type, page) -> bytes:
+    # FastAPI's response_model pass under pydantic v2: validate, dump, render
+    adapter = TypeAdapter(model)
+    value = adapter.validate_python(page)
+    return JSONResponse(None).render(adapter.dump_python(value, mode="json"))
+
+
+def products_before(rows):
+    page = ProductPage(items=[ProductResponse(**row) for row in rows], next_cursor="x")
+    return render_via_response_model(ProductPage, page)
+
+
+def products_after(rows):
+    return ORJSONResponse(None).render({"items": rows, "next_cursor": "x"})
+
+
+def orders_before(rows):
+    page = OrderPage(items=[
+        OrderResponse(**{**order, "items": [OrderItemResponse(**item) for item in order["items"]]})
+        for order in rows
+    ])
+    return render_via_response_model(OrderPage, page)
+
+
+def orders_after(rows):
+    return ORJSONResponse(None).render({"items": rows, "next_cursor": None})
+
+
+def cart_before(rows):
+    cart = CartResponse(
+        items=[CartItemResponse(**row) for row in rows],
+        total_price=sum(row["subtotal"] for row in rows),
+        item_count=len(rows),
+    )
+    return render_via_response_model(CartResponse, cart)
+
+
+def cart_after(rows):
+    return ORJSONResponse(None).render({
+        "items": rows,
+        "total_price": sum(row["subtotal"] for row in rows),
+        "item_count": len(rows),
+    })
+
+
+SHAPES = {
+    "products": (product_rows, products_before, products_after),
+    "orders": (order_rows, orders_before, orders_after),
+    "cart": (cart_rows, cart_before, cart_after),
+}
+
+
+def best_of(fn, rows, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(sizes: list[int], repeat: int) -> None:
+    print(f"{'shape':<9} {'items':>6} {'before us/item':>15} {'after us/item':>14} {'speedup':>8}")
+    for name, (make_rows, before, after) in SHAPES.items():
+        for size in sizes:
+            rows = make_rows(size)
+            # Both paths must produce the same document
+            assert json.loads(before(rows)) == json.loads(after(rows)), name
+            slow = best_of(before, rows, repeat) / size * 1e6
+            fast = best_of(after, rows, repeat) / size * 1e6
+            print(f"{name:<9} {size:>6} {slow:>15.2f} {fast:>14.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,110 @@
+"""
+Signup load test: concurrent registrations against a large `users` table.
+
+Seeds --users rows, then fires --signups registrations through
+auth.service.register_user with bounded concurrency. A share of them
+collide with existing accounts, or with each other (two concurrent signups
+for the same new name), to exercise the duplicate and race paths. Reports
+throughput and outcome counts: duplicates must come back as http_400,
+never as an unhandled IntegrityError.
+
+SQLite allows one writer at a time, so "database is locked" outcomes at
+high concurrency are SQLite's, not the app's; point DATABASE_URL at
+Postgres for representative numbers.
+
+bcrypt runs at its minimum cost here so the database path dominates.
+
+Usage:
+    python -m benchmarks.signup_load --users 1000000 --signups 10000 --concurrency 200
+    DATABASE_URL=postgresql://... python -m benchmarks.signup_load
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_signup_load.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_QUEUE_TIMEOUT", "60")
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import shutdown_password_hasher
+from app.modules.auth import service
+from app.modules.auth.models import User
+import app.modules.products.models  # noqa: F401 — register remaining tables
+import app.modules.cart.models  # noqa: F401
+import app.modules.payments.models  # noqa: F401
+
+SEED_CHUNK = 10000
+
+
+async def seed(users: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, users, SEED_CHUNK):
+            await conn.execute(insert(User), [
+                {"username": f"seed{i}", "email": f"seed{i}@example.com", "hashed_password": "x"}
+                for i in range(start, min(start + SEED_CHUNK, users))
+            ])
+
+
+def signup_names(users: int, signups: int, duplicate_ratio: float) -> list[str]:
+    names = []
+    for i in range(signups):
+        roll = random.random()
+        if roll < duplicate_ratio / 2:
+            names.append(f"SEED{random.randrange(users)}")  # existing account, different case
+        elif roll < duplicate_ratio:
+            names.append(f"race{i // 2}")  # neighbours race for the same new name
+        else:
+            names.append(f"new{i}")
+    return names
+
+
+async def main(users: int, signups: int, concurrency: int, duplicate_ratio: float) -> None:
+    started = time.perf_counter()
+    await seed(users)
+    print(f"seeded {users} users in {time.perf_counter() - started:.1f}s")
+
+    outcomes = collections.Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def signup(name: str):
+        async with semaphore, SessionLocal() as db:
+            try:
+                await service.register_user(db, username=name, email=f"{name}@example.com", password="pw")
+                outcomes["created"] += 1
+            except HTTPException as e:
+                outcomes[f"http_{e.status_code}"] += 1
+            except Exception as e:
+                outcomes[f"error ({type(e).__name__}: {str(e).splitlines()[0][:60]})"] += 1
+
+    names = signup_names(users, signups, duplicate_ratio)
+    started = time.perf_counter()
+    await asyncio.gather(*(signup(name) for name in names))
+    elapsed = time.perf_counter() - started
+
+    print(f"signups={signups} concurrency={concurrency} in {elapsed:.1f}s → {signups / elapsed:.0f}/s")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome:<28} {count}")
+
+    shutdown_password_hasher()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--signups", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.signups, args.concurrency, args.duplicate_ratio))
@@ -0,0 +1,97 @@
+"""
+Worker cold start: how long a fresh process takes to serve, phase by phase.
+
+Each run is a new interpreter (what a uvicorn worker or a scaled-up
+container pays), timing:
+
+    import    `import app.main` (routers, models, settings)
+    startup   the lifespan handler up to `yield`
+    ready     the first GET /health/ready, which opens the first DB
+              connection and checks the schema revision
+    total     interpreter launch to ready, as seen from outside
+
+--create-all adds the old startup step, Base.metadata.create_all, to show
+what it cost: a round trip per table, on every worker, before serving.
+
+The database is migrated once up front (alembic upgrade head).
+
+Usage:
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --create-all
+    DATABASE_URL=postgresql://... python -m benchmarks.startup
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_startup.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+PHASES = ("import", "startup", "ready", "total")
+
+
+async def child(create_all: bool) -> dict:
+    """Runs inside the measured process."""
+    timings = {}
+    started = time.perf_counter()
+    import httpx
+    from app.main import app
+    timings["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        if create_all:
+            from app.core.database import Base, engine
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        timings["startup"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/health/ready")
+        timings["ready"] = time.perf_counter() - started
+        if response.status_code != 200:
+            raise SystemExit(f"not ready: {response.text}")
+    return timings
+
+
+def run_once(create_all: bool) -> dict:
+    args = [sys.executable, "-m", "benchmarks.startup", "--child"] + (["--create-all"] if create_all else [])
+    started = time.perf_counter()
+    output = subprocess.run(args, check=True, capture_output=True, text=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+def main(runs: int, create_all: bool) -> None:
+    if os.path.exists(DB_PATH) and os.environ["DATABASE_URL"].endswith(DB_PATH):
+        os.remove(DB_PATH)
+    subprocess.run(["alembic", "upgrade", "head"], check=True, capture_output=True)
+
+    samples = [run_once(create_all) for _ in range(runs)]
+
+    print(f"runs={runs} create_all={create_all}")
+    print(f"{'phase':<8} {'median ms':>10} {'max ms':>10}")
+    for phase in PHASES:
+        values = [sample[phase] * 1000 for sample in samples]
+        print(f"{phase:<8} {statistics.median(values):>10.1f} {max(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--create-all", action="store_true", help="also run create_all at startup, as before migrations")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.create_all))))
+    else:
+        main(args.runs, args.create_all)
@@ -0,0 +1,124 @@
+"""
+Replay a storm of duplicate and out-of-order payment callbacks.
+
+Seeds pending orders, then feeds --callbacks webhook events for them
+through the inbox (record_webhook) with heavy duplication and shuffled
+order, some orders receiving both "paid" and "failed". The consumer
+(apply_webhook_events) drains the inbox afterwards. Checks the end state:
+one inbox row per distinct event, no order left pending, orders with a
+single outcome got it, and stock adds up.
+
+On SQLite keep --concurrency modest; beyond that writers hit SQLite's own
+"database is locked" limit. Point DATABASE_URL at Postgres for real numbers.
+
+Usage:
+    python -m benchmarks.webhook_replay --orders 1000 --callbacks 10000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_webhook_replay.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import func, insert, select
+
+from app.core.database import Base, SessionLocal, engine
+from app.modules.auth.models import User
+from app.modules.payments import service
+from app.modules.payments.gateway import WebhookCallback
+from app.modules.payments.models import Order, OrderItem, OrderStatus, WebhookEvent
+from app.modules.products.models import Product
+import app.modules.cart.models  # noqa: F401 — register remaining tables
+
+STOCK = 1_000_000
+
+
+async def seed(orders: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}])
+        # Stock already reserved by the pending orders: one unit each
+        await conn.execute(insert(Product), [{"id": 1, "name": "Product", "price": 9.99, "stock": STOCK - orders, "created_by": 1}])
+        await conn.execute(insert(Order), [
+            {"id": i, "user_id": 1, "total_price": 9.99, "status": OrderStatus.PENDING} for i in range(1, orders + 1)
+        ])
+        await conn.execute(insert(OrderItem), [
+            {"order_id": i, "product_id": 1, "product_name": "Product", "product_price": 9.99, "quantity": 1}
+            for i in range(1, orders + 1)
+        ])
+
+
+def make_callbacks(orders: int, callbacks: int) -> tuple[list[WebhookCallback], dict[int, set]]:
+    outcomes = {}
+    for order_id in range(1, orders + 1):
+        roll = random.random()
+        outcomes[order_id] = {"paid"} if roll < 0.6 else {"failed"} if roll < 0.9 else {"paid", "failed"}
+    distinct = [
+        WebhookCallback(event_id=f"{order_id}:{status}", order_id=order_id, status=status)
+        for order_id, statuses in outcomes.items() for status in statuses
+    ]
+    # Every event at least once, the rest are provider retries
+    stream = distinct + random.choices(distinct, k=max(0, callbacks - len(distinct)))
+    random.shuffle(stream)
+    return stream, outcomes
+
+
+async def main(orders: int, callbacks: int, concurrency: int) -> None:
+    # "paid after release" warnings are expected here, one per mixed-outcome order
+    logging.getLogger(service.__name__).setLevel(logging.ERROR)
+    await seed(orders)
+    stream, outcomes = make_callbacks(orders, callbacks)
+    queue = iter(stream)
+    accepted = 0
+
+    async def deliver():
+        nonlocal accepted
+        async with SessionLocal() as db:
+            for callback in queue:
+                inserted = await service.record_webhook(db, "bench", callback, b"{}")
+                accepted += inserted
+
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver() for _ in range(concurrency)))
+    ingest = time.perf_counter() - started
+
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        while await service.apply_webhook_events(db, batch_size=500):
+            pass
+    apply = time.perf_counter() - started
+
+    async with SessionLocal() as db:
+        inbox = await db.scalar(select(func.count()).select_from(WebhookEvent))
+        statuses = dict((await db.execute(select(Order.id, Order.status))).all())
+        stock = await db.scalar(select(Product.stock).where(Product.id == 1))
+
+    distinct = sum(len(s) for s in outcomes.values())
+    wrong = [
+        order_id for order_id, expected in outcomes.items()
+        if statuses[order_id] not in expected
+    ]
+    held = sum(1 for status in statuses.values() if status != OrderStatus.FAILED)
+
+    print(f"orders={orders} callbacks={len(stream)} distinct events={distinct} concurrency={concurrency}")
+    print(f"ingest: {len(stream) / ingest:8.0f} callbacks/s   accepted {accepted}, inbox rows {inbox}")
+    print(f"apply:  {distinct / apply:8.0f} events/s")
+    print(f"pending left {sum(1 for s in statuses.values() if s == OrderStatus.PENDING)}, "
+          f"wrong outcome {len(wrong)}, stock {'ok' if stock + held == STOCK else 'MISMATCH'}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--callbacks", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.orders, args.callbacks, args.concurrency))
@@ -0,0 +1,64 @@
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.core.database import Base, get_async_url
+from app.modules.auth.models import User  # noqa: F401 — register tables on Base.metadata
+from app.modules.products.models import Product  # noqa: F401
+from app.modules.cart.models import Cart, CartItem  # noqa: F401
+from app.modules.payments.models import Order, OrderItem  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Search index objects are backend-specific DDL, not part of the models
+    if type_ == "table" and name.startswith("products_fts"):
+        return False
+    if name in ("search_vector", "ix_products_search_vector"):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """`alembic upgrade head --sql`: print the SQL instead of running it."""
+    context.configure(
+        url=str(get_async_url(settings.DATABASE_URL)),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection) -> None:
+    # render_as_batch: SQLite can't ALTER columns, batch mode rebuilds the table
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    engine = create_async_engine(get_async_url(settings.DATABASE_URL), poolclass=NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
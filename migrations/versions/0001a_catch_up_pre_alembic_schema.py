@@ -0,0 +1,114 @@
+"""catch up with the schema changes made before migrations existed
+
+Adds products.updated_at and orders.reserved_until, swaps the exact
+username unique constraint for case-insensitive unique indexes on
+username and email, and adds the listing and order-history indexes.
+
+Databases stamped at 0001 may come from any create_all-era build, so
+each step checks what is already there. Case-variant duplicates
+("Alice"/"alice") cannot be merged safely (orders and carts point at
+both rows), so the upgrade stops and lists them instead.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Names SQLite's unnamed inline constraints for batch mode
+NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _check_case_duplicates(bind, column: str) -> None:
+    rows = bind.execute(sa.text(
+        f"SELECT lower({column}), count(*) FROM users GROUP BY lower({column}) HAVING count(*) > 1"
+    )).all()
+    if rows:
+        listed = ", ".join(f"{value!r} ({count} rows)" for value, count in rows[:20])
+        raise RuntimeError(
+            f"users.{column} has values that differ only in case: {listed}. "
+            f"Rename or merge these accounts, then run the upgrade again."
+        )
+
+
+def _drop_username_unique(bind) -> None:
+    for constraint in sa.inspect(bind).get_unique_constraints("users"):
+        if constraint["column_names"] != ["username"]:
+            continue
+        if constraint["name"]:
+            with op.batch_alter_table("users") as batch:
+                batch.drop_constraint(constraint["name"], type_="unique")
+        else:
+            with op.batch_alter_table("users", naming_convention=NAMING_CONVENTION) as batch:
+                batch.drop_constraint("uq_users_username", type_="unique")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _check_case_duplicates(bind, "username")
+    _check_case_duplicates(bind, "email")
+    # Before the expression indexes: SQLite's batch copy of users would drop them
+    _drop_username_unique(bind)
+    op.create_index("uq_users_username_lower", "users", [sa.text("lower(username)")], unique=True, if_not_exists=True)
+    op.create_index("uq_users_email_lower", "users", [sa.text("lower(email)")], unique=True, if_not_exists=True)
+
+    inspector = sa.inspect(bind)
+    if "updated_at" not in {c["name"] for c in inspector.get_columns("products")}:
+        # SQLite can't ADD COLUMN with a non-constant default; set it in a second step
+        op.add_column("products", sa.Column("updated_at", sa.DateTime(timezone=True)))
+        op.execute("UPDATE products SET updated_at = created_at")
+        with op.batch_alter_table("products") as batch:
+            batch.alter_column("updated_at", existing_type=sa.DateTime(timezone=True), server_default=sa.func.now())
+    if "reserved_until" not in {c["name"] for c in inspector.get_columns("orders")}:
+        op.add_column("orders", sa.Column("reserved_until", sa.DateTime(timezone=True), nullable=True))
+
+    op.create_index("ix_products_created_at_id", "products", ["created_at", "id"], if_not_exists=True)
+    op.create_index(
+        "ix_products_created_by_created_at_id", "products", ["created_by", "created_at", "id"], if_not_exists=True
+    )
+    op.create_index("ix_products_price", "products", ["price"], if_not_exists=True)
+    op.create_index(
+        "ix_products_in_stock_created_at_id",
+        "products",
+        ["created_at", "id"],
+        postgresql_where=sa.text("stock > 0"),
+        sqlite_where=sa.text("stock > 0"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_orders_user_id_created_at_id",
+        "orders",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_orders_pending_reserved_until",
+        "orders",
+        ["reserved_until"],
+        postgresql_where=sa.text("status = 'pending'"),
+        sqlite_where=sa.text("status = 'pending'"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_pending_reserved_until", table_name="orders")
+    op.drop_index("ix_orders_user_id_created_at_id", table_name="orders")
+    op.drop_index("ix_products_in_stock_created_at_id", table_name="products")
+    op.drop_index("ix_products_price", table_name="products")
+    op.drop_index("ix_products_created_by_created_at_id", table_name="products")
+    op.drop_index("ix_products_created_at_id", table_name="products")
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_column("reserved_until")
+    with op.batch_alter_table("products") as batch:
+        batch.drop_column("updated_at")
+    op.drop_index("uq_users_email_lower", table_name="users")
+    op.drop_index("uq_users_username_lower", table_name="users")
+    with op.batch_alter_table("users") as batch:
+        batch.create_unique_constraint("uq_users_username", ["username"])
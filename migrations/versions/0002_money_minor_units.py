@@ -0,0 +1,49 @@
+"""money as integer minor units
+
+products.price, orders.total_price and order_items.product_price go from
+FLOAT to BIGINT cents/tiyins. Values are rounded, not truncated, so a
+stored 19.989999... becomes 1999.
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+MONEY_COLUMNS = [
+    ("products", "price"),
+    ("orders", "total_price"),
+    ("order_items", "product_price"),
+]
+
+
+def upgrade() -> None:
+    for table, column in MONEY_COLUMNS:
+        op.execute(f"UPDATE {table} SET {column} = ROUND({column} * 100)")
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                column,
+                type_=sa.BigInteger(),
+                existing_type=sa.Float(),
+                existing_nullable=False,
+                postgresql_using=f"{column}::bigint",
+            )
+
+
+def downgrade() -> None:
+    for table, column in MONEY_COLUMNS:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                column,
+                type_=sa.Float(),
+                existing_type=sa.BigInteger(),
+                existing_nullable=False,
+                postgresql_using=f"{column}::double precision",
+            )
+        op.execute(f"UPDATE {table} SET {column} = {column} / 100.0")
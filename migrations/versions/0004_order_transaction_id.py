@@ -0,0 +1,30 @@
+"""orders.transaction_id for payment reconciliation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("transaction_id", sa.String(), nullable=True))
+    op.create_index(
+        "ix_orders_pending_transaction",
+        "orders",
+        ["id"],
+        postgresql_where=sa.text("status = 'pending' AND transaction_id IS NOT NULL"),
+        sqlite_where=sa.text("status = 'pending' AND transaction_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_pending_transaction", table_name="orders")
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_column("transaction_id")
@@ -0,0 +1,20 @@
+"""index cart_items.cart_id for cart reads, clears and checkout
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_cart_items_cart_id", "cart_items", ["cart_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cart_items_cart_id", table_name="cart_items")
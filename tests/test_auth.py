@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from app.modules.auth import service
+from app.modules.auth.models import User
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_non_ascii_username_logs_in_as_registered(db):
+    await service.register_user(db, "Émile", "emile@example.com", "secret123")
+
+    for spelling in ("Émile", "ÉMILE"):
+        assert (await service.login_user(db, spelling, "secret123"))["access_token"]
+
+
+async def test_duplicates_are_case_insensitive(db):
+    await service.register_user(db, "Zoë", "zoe@example.com", "secret123")
+
+    # ASCII letters only: SQLite's lower() leaves "Ë" alone, Postgres folds it
+    with pytest.raises(HTTPException) as error:
+        await service.register_user(db, "zoë", "other@example.com", "secret123")
+    assert error.value.detail == "Username already taken"
+
+    with pytest.raises(HTTPException) as error:
+        await service.register_user(db, "zoe2", "ZOE@Example.com", "secret123")
+    assert error.value.detail == "Email already registered"
+
+
+async def test_wrong_password_is_rejected(db):
+    await service.register_user(db, "Łukasz", "lukasz@example.com", "secret123")
+
+    with pytest.raises(HTTPException) as error:
+        await service.login_user(db, "Łukasz", "wrong")
+    assert error.value.status_code == 401
+
+
+async def test_no_transaction_is_open_while_hashing(db, monkeypatch):
+    open_during_hash = []
+
+    def watch(hasher):
+        async def wrapper(*args):
+            open_during_hash.append(db.in_transaction())
+            return await hasher(*args)
+        return wrapper
+
+    monkeypatch.setattr(service, "hash_password_async", watch(service.hash_password_async))
+    monkeypatch.setattr(service, "verify_and_update_password_async", watch(service.verify_and_update_password_async))
+
+    await service.register_user(db, "pooled", "pooled@example.com", "secret123")
+    await service.login_user(db, "pooled", "secret123")
+
+    assert open_during_hash == [False, False]
+
+
+async def test_outdated_hash_is_replaced_on_login(db, monkeypatch):
+    await service.register_user(db, "rehashed", "rehashed@example.com", "secret123")
+
+    async def outdated(password, hashed_password):
+        return True, "new-hash"
+
+    monkeypatch.setattr(service, "verify_and_update_password_async", outdated)
+    await service.login_user(db, "rehashed", "secret123")
+
+    stored = await db.scalar(select(User.hashed_password).where(User.username == "rehashed"))
+    assert stored == "new-hash"
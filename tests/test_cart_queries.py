@@ -0,0 +1,44 @@
+import pytest
+from app.core.database import QueryStats, query_stats
+from app.modules.cart import service
+from app.modules.cart.models import Cart, CartItem
+
+pytestmark = pytest.mark.anyio
+
+
+async def _statements_for_get_cart(db, user_id: int) -> int:
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        await service.get_cart(db, user_id)
+    finally:
+        query_stats.reset(token)
+    return stats.count
+
+
+async def test_get_cart_statement_count_does_not_grow_with_cart_size(db, make_user, make_product):
+    user = await make_user()
+    cart = Cart(user_id=user.id)
+    db.add(cart)
+    await db.commit()
+
+    counts, in_cart = {}, 0
+    for size in (1, 5, 25):
+        for _ in range(size - in_cart):
+            product = await make_product()
+            db.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=2))
+        await db.commit()
+        in_cart = size
+        counts[size] = await _statements_for_get_cart(db, user.id)
+
+    assert counts == {1: 1, 5: 1, 25: 1}
+
+
+async def test_get_cart_totals(db, make_user, make_product):
+    user = await make_user()
+    cheap, dear = await make_product(price="1.10"), await make_product(price="2.25")
+    await service.add_to_cart(db, user.id, cheap.id, 3)
+    cart = await service.add_to_cart(db, user.id, dear.id, 2)
+
+    assert cart["item_count"] == 5
+    assert str(cart["total_price"]) == "7.80"
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+from app.core.database import SessionLocal
+from app.modules.cart.models import Cart, CartItem
+from app.modules.payments import service
+from app.modules.payments.gateway import MockGateway
+from app.modules.payments.models import Order, OrderItem, OrderStatus
+
+pytestmark = pytest.mark.anyio
+
+BUYERS = 50
+STOCK = 20
+
+
+async def test_parallel_checkouts_never_oversell(db, make_user, make_product):
+    product = await make_product(stock=STOCK)
+    buyers = [await make_user() for _ in range(BUYERS)]
+    cart_ids = (await db.execute(
+        insert(Cart).returning(Cart.id), [{"user_id": buyer.id} for buyer in buyers]
+    )).scalars().all()
+    await db.execute(insert(CartItem), [
+        {"cart_id": cart_id, "product_id": product.id, "quantity": 1} for cart_id in cart_ids
+    ])
+    await db.commit()
+    gateway = MockGateway()
+
+    async def buy(user_id: int) -> str:
+        # Each buyer on its own session and connection, as concurrent requests are
+        try:
+            async with SessionLocal() as session:
+                await service.checkout(session, user_id, gateway)
+        except HTTPException as e:
+            return f"http_{e.status_code}"
+        return "sold"
+
+    outcomes = await asyncio.gather(*(buy(buyer.id) for buyer in buyers))
+
+    sold = outcomes.count("sold")
+    assert sold == STOCK
+    assert set(outcomes) <= {"sold", "http_400", "http_409"}
+
+    await db.refresh(product)
+    units_in_orders = await db.scalar(
+        select(func.coalesce(func.sum(OrderItem.quantity), 0))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(OrderItem.product_id == product.id, Order.status != OrderStatus.FAILED)
+    )
+    assert product.stock == 0
+    assert units_in_orders == STOCK
+
+
+async def test_duplicate_cart_lines_are_bought_together(db, make_user, make_product):
+    # Two concurrent POST /cart/ calls can each insert a line for the same product
+    user, product = await make_user(), await make_product(stock=10)
+    cart = Cart(user_id=user.id)
+    db.add(cart)
+    await db.flush()
+    await db.execute(insert(CartItem), [
+        {"cart_id": cart.id, "product_id": product.id, "quantity": 2},
+        {"cart_id": cart.id, "product_id": product.id, "quantity": 3},
+    ])
+    await db.commit()
+
+    async with SessionLocal() as session:
+        result = await service.checkout(session, user.id, MockGateway())
+
+    ordered = await db.scalar(select(func.sum(OrderItem.quantity)).where(OrderItem.order_id == result.order_id))
+    await db.refresh(product)
+    assert ordered == 5
+    assert product.stock == 5
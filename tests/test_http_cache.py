@@ -0,0 +1,69 @@
+import gzip
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from app.core.http_cache import ETagGZipMiddleware, is_not_modified, make_etag, not_modified, set_cache_headers
+
+BODY = b"x" * 2000
+ETAG = make_etag(BODY)
+
+app = FastAPI()
+app.add_middleware(ETagGZipMiddleware, minimum_size=1000)
+
+
+@app.get("/catalog")
+def catalog(request: Request):
+    if is_not_modified(request, ETAG):
+        return not_modified(ETAG)
+    response = Response(BODY, media_type="text/plain")
+    set_cache_headers(response, ETAG)
+    return response
+
+
+@app.get("/encoded")
+def already_encoded():
+    return Response(gzip.compress(BODY), headers={"ETag": '"abc-gzip"', "Content-Encoding": "gzip"})
+
+
+client = TestClient(app)
+
+
+def get(path: str = "/catalog", **headers):
+    return client.get(path, headers=headers)
+
+
+def test_gzip_and_identity_responses_have_different_etags():
+    gzipped = get(**{"Accept-Encoding": "gzip"})
+    identity = get(**{"Accept-Encoding": "identity"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == ETAG
+    assert gzipped.headers["etag"] == ETAG[:-1] + '-gzip"'
+
+
+def test_each_variant_revalidates_with_its_own_tag():
+    gzip_tag = get(**{"Accept-Encoding": "gzip"}).headers["etag"]
+
+    revalidated = get(**{"Accept-Encoding": "gzip", "If-None-Match": gzip_tag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == gzip_tag
+
+    revalidated = get(**{"Accept-Encoding": "gzip", "If-None-Match": ETAG})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == ETAG
+
+    revalidated = get(**{"Accept-Encoding": "identity", "If-None-Match": ETAG})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == ETAG
+
+
+def test_stale_tag_gets_the_full_body():
+    response = get(**{"Accept-Encoding": "gzip", "If-None-Match": '"stale-gzip"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_app_encoded_responses_keep_their_tag():
+    response = get("/encoded", **{"Accept-Encoding": "gzip"})
+    assert response.headers["etag"] == '"abc-gzip"'
+    assert response.content == BODY
@@ -0,0 +1,73 @@
+from decimal import Decimal
+import pytest
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.money import Money, MoneyType, from_minor, to_minor, to_money
+
+CENTS = [*range(0, 2000), 9999, 10001, 123456789, 10**13 - 1]
+
+
+@pytest.mark.parametrize("cents", CENTS[::50] + CENTS[-4:])
+def test_float_str_and_decimal_inputs_agree(cents):
+    units, rest = divmod(cents, 100)
+    text = f"{units}.{rest:02d}"
+    assert to_minor(float(text)) == to_minor(text) == to_minor(Decimal(text)) == cents
+
+
+def test_round_trip_over_every_cent():
+    for cents in CENTS:
+        money = from_minor(cents)
+        assert money == to_money(money)
+        assert to_minor(money) == cents
+        assert to_minor(float(money)) == cents  # the float repr path
+
+
+def test_float_repr_path():
+    assert 19.99 * 100 != 1999  # the bug this module exists for
+    assert to_minor(19.99) == 1999
+    assert to_minor(0.1 + 0.2) == 30
+    assert to_money(1.005) == Decimal("1.01")  # repr is "1.005", rounded half up
+
+
+def test_to_money_rounds_half_up():
+    assert to_money("2.345") == Decimal("2.35")
+    assert to_money("2.344") == Decimal("2.34")
+    assert to_money(7) == Decimal("7.00")
+
+
+def test_from_minor_has_two_places():
+    assert str(from_minor(1999)) == "19.99"
+    assert str(from_minor(500)) == "5.00"
+    assert str(from_minor(0)) == "0.00"
+
+
+@pytest.mark.parametrize("dialect", [sqlite.dialect(), postgresql.dialect()])
+def test_money_type_binds_minor_units_and_reads_decimals(dialect):
+    column = MoneyType()
+    assert column.process_bind_param(Decimal("19.99"), dialect) == 1999
+    assert column.process_bind_param(19.99, dialect) == 1999
+    assert column.process_bind_param("0.5", dialect) == 50
+    assert column.process_bind_param(None, dialect) is None
+    assert column.process_result_value(1999, dialect) == Decimal("19.99")
+    assert column.process_result_value(None, dialect) is None
+
+
+@pytest.mark.anyio
+async def test_money_column_stores_minor_units(db, make_product):
+    product = await make_product(price="19.99")
+    stored = await db.scalar(text("SELECT price FROM products WHERE id = :id"), {"id": product.id})
+    assert stored == 1999
+
+    db.expire_all()
+    await db.refresh(product)
+    assert product.price == Decimal("19.99")
+
+
+def test_money_field_validates_and_serializes_as_number():
+    adapter = TypeAdapter(Money)
+    assert adapter.validate_python("19.99") == Decimal("19.99")
+    assert adapter.dump_json(Decimal("19.99")) == b"19.99"
+    for bad in ("-1", "0.001"):
+        with pytest.raises(ValidationError):
+            adapter.validate_python(bad)
@@ -0,0 +1,214 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from app.core.database import SessionLocal
+from app.modules.cart.models import Cart, CartItem
+from app.modules.payments import service
+from app.modules.payments.gateway import MulticardGateway, PaymentOutcomeUnknown, PaymentVerificationError
+from app.modules.payments.models import Order, OrderItem, OrderStatus
+from app.modules.payments.tasks import reconcile_pending_orders
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeMulticard:
+    """
+    Just enough of the Multicard API. Each token it hands out is only
+    accepted while it is the latest one; `invoice_replies` scripts the
+    invoice endpoints (status codes, or exceptions to raise), after which
+    they answer normally.
+    """
+
+    def __init__(self, payment_status: str = "paid", expiry: datetime = None):
+        self.payment_status = payment_status
+        self.expiry = expiry
+        self.invoice_replies: list = []
+        self.calls: list[str] = []
+        self.tokens_issued = 0
+
+    @property
+    def auth_calls(self) -> int:
+        return self.calls.count("POST /auth")
+
+    def _reply(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(f"{request.method} {request.url.path}")
+        if request.url.path == "/auth":
+            self.tokens_issued += 1
+            body = {"token": f"token-{self.tokens_issued}"}
+            if self.expiry:
+                body["expiry"] = self.expiry.isoformat()
+            return httpx.Response(200, json=body)
+
+        if self.invoice_replies:
+            reply = self.invoice_replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return httpx.Response(reply, json={"success": False})
+        if request.headers["X-Access-Token"] != f"token-{self.tokens_issued}":
+            return httpx.Response(401, json={"success": False, "error": {"details": "token expired"}})
+        if request.method == "POST":
+            return httpx.Response(200, json={"success": True, "data": {"uuid": "tx-1", "checkout_url": "https://pay/tx-1"}})
+        return httpx.Response(200, json={"success": True, "data": {"payment": {"status": self.payment_status}}})
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        return self._reply(request)
+
+    async def async_handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/auth":
+            await asyncio.sleep(0.01)  # slow enough for concurrent callers to pile up
+        return self._reply(request)
+
+
+def make_gateway(handler, max_retries: int = 3) -> MulticardGateway:
+    gateway = MulticardGateway("app", "secret", transport=httpx.MockTransport(handler), max_retries=max_retries)
+    gateway.BACKOFF_BASE = 0.0
+    return gateway
+
+
+async def test_concurrent_callers_authenticate_once():
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.async_handler)
+
+    results = await asyncio.gather(*(gateway.verify_payment_async(f"tx-{i}") for i in range(20)))
+
+    assert results == [True] * 20
+    assert fake.auth_calls == 1
+
+
+def test_rejected_token_is_refreshed_once():
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.handler)
+    assert gateway.verify_payment("tx-1")
+
+    fake.tokens_issued += 1  # Multicard revokes the cached token early
+    assert gateway.verify_payment("tx-1")
+
+    assert fake.auth_calls == 2
+    assert fake.calls[-3:] == ["GET /payment/invoice/tx-1", "POST /auth", "GET /payment/invoice/tx-1"]
+
+
+def test_token_is_refreshed_before_it_expires():
+    almost_expired = datetime.now(timezone.utc) + timedelta(seconds=MulticardGateway.TOKEN_REFRESH_MARGIN - 1)
+    fake = FakeMulticard(expiry=almost_expired)
+    gateway = make_gateway(fake.handler)
+
+    gateway.verify_payment("tx-1")
+    gateway.verify_payment("tx-2")
+
+    assert fake.auth_calls == 2
+
+
+def test_token_is_reused_until_expiry():
+    fake = FakeMulticard(expiry=datetime.now(timezone.utc) + timedelta(hours=1))
+    gateway = make_gateway(fake.handler)
+
+    gateway.verify_payment("tx-1")
+    gateway.verify_payment("tx-2")
+
+    assert fake.auth_calls == 1
+
+
+def test_idempotent_calls_are_retried():
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.handler)
+    fake.invoice_replies = [503, httpx.ReadTimeout("slow"), 502]
+
+    assert gateway.verify_payment("tx-1")
+    assert fake.calls.count("GET /payment/invoice/tx-1") == 4
+
+
+def test_invoice_creation_is_not_retried_after_reaching_multicard():
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.handler)
+    fake.invoice_replies = [503]
+
+    result = gateway.create_payment(1, Decimal("10.00"))
+
+    assert not result.success
+    assert fake.calls.count("POST /payment/invoice") == 1
+
+
+def test_invoice_creation_is_retried_when_connect_fails():
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.handler)
+    fake.invoice_replies = [httpx.ConnectError("refused")]
+
+    result = gateway.create_payment(1, Decimal("10.00"))
+
+    assert result.success and result.transaction_id == "tx-1"
+    assert fake.calls.count("POST /payment/invoice") == 2
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout("slow"), httpx.RemoteProtocolError("dropped")])
+def test_lost_invoice_reply_is_unknown_not_rejected(error):
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.handler)
+    fake.invoice_replies = [error]
+
+    with pytest.raises(PaymentOutcomeUnknown):
+        gateway.create_payment(1, Decimal("10.00"))
+    assert fake.calls.count("POST /payment/invoice") == 1
+
+
+async def test_checkout_keeps_order_pending_when_invoice_reply_is_lost(db, make_user, make_product):
+    user, product = await make_user(), await make_product(stock=5)
+    cart = Cart(user_id=user.id)
+    db.add(cart)
+    await db.flush()
+    db.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=2))
+    await db.commit()
+    fake = FakeMulticard()
+    fake.invoice_replies = [httpx.ReadTimeout("slow")]
+
+    with pytest.raises(HTTPException) as error:
+        async with SessionLocal() as session:
+            await service.checkout(session, user.id, make_gateway(fake.async_handler))
+
+    assert error.value.status_code == 504
+    order = await db.scalar(select(Order).where(Order.user_id == user.id))
+    await db.refresh(product)
+    assert order.status == OrderStatus.PENDING
+    assert product.stock == 3  # still reserved until reserved_until
+
+
+def test_unpaid_invoice_is_reported_unpaid():
+    gateway = make_gateway(FakeMulticard(payment_status="draft").handler)
+    assert gateway.verify_payment("tx-1") is False
+
+
+@pytest.mark.parametrize("reply", [503, 404, httpx.ConnectError("refused")])
+def test_outage_is_not_reported_as_unpaid(reply):
+    fake = FakeMulticard()
+    gateway = make_gateway(fake.handler, max_retries=0)
+    fake.invoice_replies = [reply]
+
+    with pytest.raises((PaymentVerificationError, httpx.TransportError)):
+        gateway.verify_payment("tx-1")
+
+
+async def test_reconciler_leaves_orders_pending_during_an_outage(db, make_user, make_product):
+    user, product = await make_user(), await make_product(stock=4)
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    order = Order(
+        user_id=user.id, total_price=product.price, status=OrderStatus.PENDING,
+        created_at=long_ago, reserved_until=long_ago, transaction_id="tx-outage",
+    )
+    db.add(order)
+    await db.flush()
+    db.add(OrderItem(order_id=order.id, product_id=product.id, product_name=product.name,
+                     product_price=product.price, quantity=1))
+    await db.commit()
+
+    def outage(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("Multicard is down")
+
+    await reconcile_pending_orders(make_gateway(outage, max_retries=0), min_age=0)
+
+    await db.refresh(order)
+    await db.refresh(product)
+    assert order.status == OrderStatus.PENDING
+    assert product.stock == 4
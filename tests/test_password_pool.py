@@ -0,0 +1,36 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from fastapi import HTTPException
+from app.core import security
+
+pytestmark = pytest.mark.anyio
+
+
+def _broken_executor():
+    executor = security._get_hash_executor()
+    with pytest.raises(BrokenProcessPool):
+        executor.submit(os._exit, 1).result()  # a worker dies, as on an OOM kill
+    return executor
+
+
+async def test_broken_pool_is_replaced():
+    broken = _broken_executor()
+    try:
+        hashed = await security.hash_password_async("secret123")
+
+        assert security.verify_password("secret123", hashed)
+        assert security._hash_executor is not broken
+    finally:
+        security.shutdown_password_hasher()
+
+
+async def test_pool_that_keeps_breaking_answers_503(monkeypatch):
+    broken = _broken_executor()
+    monkeypatch.setattr(security, "_get_hash_executor", lambda: broken)
+    try:
+        with pytest.raises(HTTPException) as error:
+            await security.hash_password_async("secret123")
+        assert error.value.status_code == 503
+    finally:
+        security.shutdown_password_hasher()
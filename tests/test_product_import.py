@@ -0,0 +1,63 @@
+from decimal import Decimal
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.modules.products import service
+from app.modules.products.models import Product
+
+pytestmark = pytest.mark.anyio
+
+ROWS = 25
+
+
+async def upload(prefix: str, rows: int = ROWS, on_line=None):
+    yield "name,price,stock\n"
+    for i in range(rows):
+        if on_line:
+            await on_line(i)
+        yield f"{prefix}-{i},19.99,{i}\n" if i % 5 else f"{prefix}-{i},-1,{i}\n"  # every 5th row is invalid
+
+
+async def count(db, prefix: str) -> int:
+    return await db.scalar(select(func.count()).select_from(Product).where(Product.name.like(f"{prefix}-%")))
+
+
+async def test_rows_are_validated_and_inserted(db, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 4)
+    user = await make_user()
+
+    result = await service.import_products(db, upload("valid"), "csv", user.id)
+
+    assert (result.imported, result.failed) == (20, 5)
+    assert [error.row for error in result.errors] == [1, 6, 11, 16, 21]
+    assert await count(db, "valid") == 20
+    product = await db.scalar(select(Product).where(Product.name == "valid-7"))
+    assert (product.price, product.stock, product.created_by) == (Decimal("19.99"), 7, user.id)
+
+
+async def test_no_transaction_while_the_upload_streams(db, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 4)
+    user = await make_user()
+    await db.commit()
+    seen = []
+
+    async def check(i: int):
+        seen.append(db.in_transaction())
+
+    await service.import_products(db, upload("slow", on_line=check), "csv", user.id)
+
+    assert seen == [False] * ROWS
+    assert await count(db, "slow") == 20
+
+
+async def test_failed_upload_imports_nothing(db, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 4)
+    monkeypatch.setattr(settings, "BULK_IMPORT_MAX_ROWS", 10)
+    user = await make_user()
+
+    with pytest.raises(HTTPException) as error:
+        await service.import_products(db, upload("too-many"), "csv", user.id)
+
+    assert error.value.status_code == 413
+    assert await count(db, "too-many") == 0
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import random
+import pytest
+from sqlalchemy import func, insert, select
+from app.core.database import SessionLocal
+from app.modules.payments import service
+from app.modules.payments.gateway import WebhookCallback
+from app.modules.payments.models import Order, OrderItem, OrderStatus, WebhookEvent
+
+pytestmark = pytest.mark.anyio
+
+ORDERS = 300
+CALLBACKS = 10_000
+STOCK = 10_000
+
+
+async def drain_inbox() -> None:
+    async with SessionLocal() as db:
+        while await service.apply_webhook_events(db, batch_size=500):
+            pass
+
+
+async def record(provider: str, callbacks: list[WebhookCallback], concurrency: int = 4) -> int:
+    queue = iter(callbacks)
+    accepted = 0
+
+    async def deliver():
+        nonlocal accepted
+        async with SessionLocal() as db:
+            for callback in queue:
+                inserted = await service.record_webhook(db, provider, callback, b"{}")
+                accepted += inserted  # not `+= await`: that reads the total before awaiting
+
+    await asyncio.gather(*(deliver() for _ in range(concurrency)))
+    return accepted
+
+
+async def test_duplicate_and_out_of_order_callbacks(db, make_user, make_product, caplog):
+    caplog.set_level(logging.ERROR, logger=service.__name__)  # "no longer pending" is expected here
+    rng = random.Random(15)
+    user = await make_user()
+    # Stock already reserved by the pending orders: one unit each
+    product = await make_product(stock=STOCK - ORDERS)
+    order_ids = (await db.execute(
+        insert(Order).returning(Order.id),
+        [{"user_id": user.id, "total_price": product.price, "status": OrderStatus.PENDING} for _ in range(ORDERS)],
+    )).scalars().all()
+    await db.execute(insert(OrderItem), [
+        {"order_id": order_id, "product_id": product.id, "product_name": product.name,
+         "product_price": product.price, "quantity": 1}
+        for order_id in order_ids
+    ])
+    await db.commit()
+
+    outcomes = {}
+    for order_id in order_ids:
+        roll = rng.random()
+        outcomes[order_id] = {"paid"} if roll < 0.6 else {"failed"} if roll < 0.9 else {"paid", "failed"}
+    distinct = [
+        WebhookCallback(event_id=f"{order_id}:{status}", order_id=order_id, status=status)
+        for order_id, statuses in outcomes.items() for status in statuses
+    ]
+    # Every event at least once, the rest are provider retries, all shuffled
+    stream = distinct + rng.choices(distinct, k=CALLBACKS - len(distinct))
+    rng.shuffle(stream)
+
+    accepted = await record("replay", stream)
+    await drain_inbox()
+
+    inbox = await db.scalar(select(func.count()).select_from(WebhookEvent).where(WebhookEvent.provider == "replay"))
+    assert accepted == inbox == len(distinct)
+
+    statuses = dict((await db.execute(select(Order.id, Order.status).where(Order.id.in_(order_ids)))).all())
+    assert OrderStatus.PENDING not in statuses.values()
+    assert all(statuses[order_id] in expected for order_id, expected in outcomes.items())
+
+    await db.refresh(product)
+    held = sum(1 for status in statuses.values() if status == OrderStatus.PAID)
+    assert product.stock + held == STOCK
+
+    # A "failed" arriving after the payment never undoes it
+    paid = [order_id for order_id, status in statuses.items() if status == OrderStatus.PAID]
+    await record("replay", [WebhookCallback(f"{order_id}:late-failure", order_id, "failed") for order_id in paid])
+    await drain_inbox()
+
+    db.expire_all()
+    late = dict((await db.execute(select(Order.id, Order.status).where(Order.id.in_(paid)))).all())
+    await db.refresh(product)
+    assert set(late.values()) == {OrderStatus.PAID}
+    assert product.stock + held == STOCK